@@ -1,4 +1,4 @@
-import concurrent.futures
+import asyncio
 import time
 import tiktoken
 
@@ -8,6 +8,9 @@ from factcheck.utils.prompt import prompt_mapper
 from factcheck.utils.logger import CustomLogger
 from factcheck.utils.api_config import load_api_config
 from factcheck.utils.data_class import PipelineUsage, FactCheckOutput, ClaimDetail, FCSummary
+from factcheck.utils.async_util import run_sync, iter_sync
+from factcheck.utils.batch import OfflineBatch, BatchPending
+from factcheck.utils.micro_batch import MicroBatcher
 from factcheck.core import (
     Decompose,
     Checkworthy,
@@ -33,6 +36,11 @@ class FactCheck:
         claim_verify_model: str = None,  # "gpt-3.5-turbo",
         api_config: dict = None,
         num_seed_retries: int = 3,
+        speculative_retrieval: bool = False,
+        max_speculative_queries: int = 50,
+        offline_batch: OfflineBatch = None,
+        decompose_shard_tokens: int = None,
+        micro_batch_window: float = 0.01,
     ):
         # TODO: better handle raw token count
         self.encoding = tiktoken.get_encoding("cl100k_base")
@@ -63,16 +71,51 @@ class FactCheck:
             setattr(self, key, LLMClient(model=_model_name, api_config=self.api_config))
 
         # sub-modules
-        self.decomposer = Decompose(llm_client=self.decompose_model, prompt=self.prompt)
+        self.decomposer = Decompose(
+            llm_client=self.decompose_model, prompt=self.prompt, shard_max_tokens=decompose_shard_tokens
+        )
         self.checkworthy = Checkworthy(llm_client=self.checkworthy_model, prompt=self.prompt)
-        self.query_generator = QueryGenerator(llm_client=self.query_generator_model, prompt=self.prompt)
+        self.query_generator = QueryGenerator(
+            llm_client=self.query_generator_model, prompt=self.prompt, offline_batch=offline_batch
+        )
         self.evidence_crawler = retriever_mapper(retriever_name=retriever)(
             llm_client=self.evidence_retrieval_model, api_config=self.api_config
         )
-        self.claimverify = ClaimVerify(llm_client=self.claim_verify_model, prompt=self.prompt)
+        self.claimverify = ClaimVerify(llm_client=self.claim_verify_model, prompt=self.prompt, offline_batch=offline_batch)
         self.attr_list = ["decomposer", "checkworthy", "query_generator", "evidence_crawler", "claimverify"]
         self.num_seed_retries = num_seed_retries
 
+        # scheduling: start evidence retrieval before checkworthiness resolves, wasting at most
+        # `max_speculative_queries` search queries per document on claims that are not checkworthy
+        self.speculative_retrieval = speculative_retrieval
+        self.max_speculative_queries = max_speculative_queries
+
+        # speculative and streaming modes work claim by claim: the query generation and retrieval requests of
+        # concurrent claims within `micro_batch_window` seconds are merged, so that they still share batched
+        # prompts, query merging and Serper batches
+        self._query_batcher = MicroBatcher(
+            lambda items: self.query_generator.agenerate_query(claims=list(items)), window=micro_batch_window
+        )
+        self._retrieval_batcher = MicroBatcher(
+            lambda items: self.evidence_crawler.aretrieve_evidence(claim_queries_dict=items), window=micro_batch_window
+        )
+
+        # offline batch mode: query generation and verification go through a batch backend, and the
+        # pipeline state of each document is persisted between stages
+        self.offline_batch = offline_batch
+        if offline_batch is not None:
+            # fail before any interactive call is spent, rather than at query generation
+            for key in ["query_generator_model", "claim_verify_model"]:
+                llm_client = getattr(self, key)
+                if not llm_client.supports_offline_batch:
+                    raise ValueError(
+                        f"{key} uses {type(llm_client).__name__}, which does not support offline batches, "
+                        "use an OpenAI compatible client (e.g. GPTClient or LocalOpenAIClient) for this step."
+                    )
+        if offline_batch is not None and speculative_retrieval:
+            logger.warning("== Speculative retrieval is disabled in offline batch mode.")
+            self.speculative_retrieval = False
+
         logger.info("===Sub-modules Init Finished===")
 
     def load_config(self, api_config: dict) -> None:
@@ -80,28 +123,59 @@ class FactCheck:
         self.api_config = load_api_config(api_config)
 
     def check_text(self, raw_text: str):
+        return run_sync(self.acheck_text(raw_text))
+
+    async def acheck_text(self, raw_text: str):
         # first clear current usage
         self._reset_usage()
 
+        # persisted pipeline state of the document in offline batch mode, None otherwise
+        state = self.offline_batch.load_state(raw_text) if self.offline_batch is not None else None
+
         st_time = time.time()
         # step 1
-        claims = self.decomposer.getclaims(doc=raw_text, num_retries=self.num_seed_retries)
-        # Parallel run restore claims and checkworthy
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_claim2doc = executor.submit(
-                self.decomposer.restore_claims, doc=raw_text, claims=claims, num_retries=self.num_seed_retries
-            )
-            # step 2
-            future_checkworthy_claims = executor.submit(
-                self.checkworthy.identify_checkworthiness, claims, num_retries=self.num_seed_retries
+        claims = await self._stage(
+            state, raw_text, "claims", lambda: self.decomposer.agetclaims(doc=raw_text, num_retries=self.num_seed_retries)
+        )
+        # restore claims is only needed for the final output, run it in the background
+        restore_task = asyncio.create_task(
+            self._stage(
+                state,
+                raw_text,
+                "claim2doc",
+                lambda: self.decomposer.arestore_claims(doc=raw_text, claims=claims, num_retries=self.num_seed_retries),
             )
-            # step 3
-            future_claim_queries_dict = executor.submit(self.query_generator.generate_query, claims=claims)
-
-            # Wait for all futures to complete
-            claim2doc = future_claim2doc.result()
-            checkworthy_claims, claim2checkworthy = future_checkworthy_claims.result()
-            claim_queries_dict = future_claim_queries_dict.result()
+        )
+        try:
+            if self.speculative_retrieval:
+                # step 2, 3 and 4 overlapped: retrieval of each claim may start before checkworthy resolves
+                (
+                    checkworthy_claims,
+                    claim2checkworthy,
+                    claim_queries_dict,
+                    claim_evidences_dict,
+                ) = await self._speculative_retrieve(claims)
+            else:
+                # Parallel run checkworthy (step 2) and query generation (step 3)
+                (checkworthy_claims, claim2checkworthy), claim_queries_dict = await self._gather_stages(
+                    self._stage(
+                        state,
+                        raw_text,
+                        "checkworthy",
+                        lambda: self.checkworthy.aidentify_checkworthiness(claims, num_retries=self.num_seed_retries),
+                    ),
+                    self._stage(
+                        state, raw_text, "claim_queries_dict", lambda: self.query_generator.agenerate_query(claims=claims)
+                    ),
+                    persist=state is not None,
+                )
+            claim2doc = await restore_task
+        except BatchPending:
+            # keep the restored claims in the persisted state for the resumed run
+            await asyncio.gather(restore_task, return_exceptions=True)
+            raise
+        finally:
+            restore_task.cancel()
 
         checkworthy_claims_S = set(checkworthy_claims)
         claim_queries_dict = {k: v for k, v in claim_queries_dict.items() if k in checkworthy_claims_S}
@@ -112,6 +186,8 @@ class FactCheck:
             logger.info(f"== Checkworthy claims {i}: {claim}")
 
         if checkworthy_claims == []:
+            if state is not None:
+                self.offline_batch.clear_state(raw_text)
             return self._finalize_factcheck(raw_text=raw_text, claim_detail=[], return_dict=True)
 
         for k, v in claim_queries_dict.items():
@@ -120,14 +196,20 @@ class FactCheck:
         step123_time = time.time()
 
         # step 4
-        claim_evidences_dict = self.evidence_crawler.retrieve_evidence(claim_queries_dict=claim_queries_dict)
+        if not self.speculative_retrieval:
+            claim_evidences_dict = await self._stage(
+                state,
+                raw_text,
+                "claim_evidences_dict",
+                lambda: self.evidence_crawler.aretrieve_evidence(claim_queries_dict=claim_queries_dict),
+            )
         for claim, evidences in claim_evidences_dict.items():
             logger.info(f"== Claim: {claim}")
             logger.info(f"== Evidence: {evidences}\n")
         step4_time = time.time()
 
         # step 5
-        claim_verifications_dict = self.claimverify.verify_claims(claim_evidences_dict=claim_evidences_dict)
+        claim_verifications_dict = await self.claimverify.averify_claims(claim_evidences_dict=claim_evidences_dict)
         for k, v in claim_verifications_dict.items():
             logger.info(f"== Claim: {k} --- Verify: {v}")
         step5_time = time.time()
@@ -143,8 +225,291 @@ class FactCheck:
             claim2verifications=claim_verifications_dict,
         )
 
+        if state is not None:
+            self.offline_batch.clear_state(raw_text)
         return self._finalize_factcheck(raw_text=raw_text, claim_detail=claim_detail, return_dict=True)
 
+    async def _stage(self, state: dict, raw_text: str, name: str, run):
+        """Run a step of the pipeline, or load its result from the persisted state of the document.
+
+        Args:
+            state (dict): the persisted state of the document in offline batch mode, None otherwise.
+            raw_text (str): the document.
+            name (str): the name of the result in the state.
+            run (Callable): returns the coroutine of the step.
+
+        Returns:
+            any: the result of the step.
+        """
+        if state is None:
+            return await run()
+        if name not in state:
+            state[name] = await run()
+            self.offline_batch.save_state(raw_text, state)
+        return state[name]
+
+    async def _gather_stages(self, *stages, persist: bool = False):
+        """Run steps concurrently. With `persist`, every step finishes (and its result is persisted) before
+        the first error is raised, e.g. `BatchPending`."""
+        results = await asyncio.gather(*stages, return_exceptions=persist)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    async def _speculative_retrieve(self, claims: list[str]):
+        """Generate queries and retrieve evidences for each claim, speculatively before checkworthiness resolves.
+
+        Args:
+            claims (list[str]): the decomposed claims of a document.
+
+        Returns:
+            tuple: checkworthy claims, claim2checkworthy, and the queries and evidences of the checkworthy claims.
+        """
+        checkworthy_task = asyncio.create_task(
+            self.checkworthy.aidentify_checkworthiness(claims, num_retries=self.num_seed_retries)
+        )
+        speculation = {"budget": self.max_speculative_queries, "wasted": 0}
+        claims = list(dict.fromkeys(claims))
+        try:
+            results = await asyncio.gather(
+                *[self._query_and_retrieve(claim, checkworthy_task, speculation=speculation) for claim in claims]
+            )
+            checkworthy_claims, claim2checkworthy = await checkworthy_task
+        finally:
+            checkworthy_task.cancel()
+        logger.info(
+            f"== Speculative retrieval: {self.max_speculative_queries - speculation['budget']} queries started early, "
+            f"{speculation['wasted']} wasted on claims that are not checkworthy."
+        )
+
+        claim_queries_dict, claim_evidences_dict = {}, {}
+        for claim, (queries, evidences) in zip(claims, results):
+            if evidences is not None:
+                claim_queries_dict[claim] = queries
+                claim_evidences_dict[claim] = evidences
+        return checkworthy_claims, claim2checkworthy, claim_queries_dict, claim_evidences_dict
+
+    async def _query_and_retrieve(self, claim: str, checkworthy_task: asyncio.Task, speculation: dict = None):
+        """Generate queries and retrieve evidences for a single claim.
+
+        Query generation starts right away. With speculative retrieval, the retrieval also starts as soon as
+        the queries exist if checkworthiness is still pending and `speculation["budget"]` (in queries) allows;
+        it is cancelled if the claim turns out not to be checkworthy.
+
+        Args:
+            claim (str): the claim to be checked.
+            checkworthy_task (asyncio.Task): the task identifying the checkworthy claims of the document.
+            speculation (dict, optional): the shared speculation state of the document, with the remaining
+                "budget" and the number of "wasted" queries. Defaults to None (no speculation).
+
+        Returns:
+            tuple: the queries and evidences of the claim, both None if the claim is not checkworthy.
+        """
+        queries_task = asyncio.create_task(self._query_batcher.submit({claim: None}))
+        retrieve_task = None
+        try:
+            if self.speculative_retrieval and speculation is not None:
+                queries = (await queries_task)[claim]
+                if not checkworthy_task.done() and len(queries) <= speculation["budget"]:
+                    speculation["budget"] -= len(queries)
+                    retrieve_task = asyncio.create_task(self._retrieval_batcher.submit({claim: queries}))
+
+            checkworthy_claims, _ = await checkworthy_task
+            if claim not in checkworthy_claims:
+                if retrieve_task is not None:
+                    speculation["wasted"] += len(queries)
+                return None, None
+
+            queries = (await queries_task)[claim]
+            if retrieve_task is None:
+                retrieve_task = asyncio.create_task(self._retrieval_batcher.submit({claim: queries}))
+            evidences = (await retrieve_task)[claim]
+            return queries, evidences
+        finally:
+            queries_task.cancel()
+            if retrieve_task is not None:
+                retrieve_task.cancel()
+
+    def check_text_stream(self, raw_text: str):
+        return iter_sync(self.acheck_text_stream(raw_text))
+
+    async def acheck_text_stream(self, raw_text: str):
+        """Fact-check a document and yield each claim as soon as it is verified.
+
+        Unlike `acheck_text`, each checkworthy claim runs its own chain of query generation, evidence
+        retrieval and verification, so the first result only waits for the chain of one claim. Claims
+        are yielded in the order they are completed, their `id` gives their position in the document.
+
+        Args:
+            raw_text (str): the document to be fact-checked.
+
+        Yields:
+            ClaimDetail: the detail of each claim, including the claims that are not checkworthy.
+            FCSummary: the summary of the whole document, yielded last.
+        """
+        self._reset_usage()
+
+        st_time = time.time()
+        claims = await self.decomposer.agetclaims(doc=raw_text, num_retries=self.num_seed_retries)
+        claims = list(dict.fromkeys(claims))
+        restore_task = asyncio.create_task(
+            self.decomposer.arestore_claims(doc=raw_text, claims=claims, num_retries=self.num_seed_retries)
+        )
+        checkworthy_task = asyncio.create_task(
+            self.checkworthy.aidentify_checkworthiness(claims, num_retries=self.num_seed_retries)
+        )
+
+        speculation = {"budget": self.max_speculative_queries, "wasted": 0}
+
+        async def check_claim(claim):
+            queries, evidences = await self._query_and_retrieve(claim, checkworthy_task, speculation=speculation)
+            if evidences is None:
+                return claim, None, None
+            claim_verifications_dict = await self.claimverify.averify_claims(claim_evidences_dict={claim: evidences})
+            return claim, queries, claim_verifications_dict[claim]
+
+        claim_tasks = [asyncio.create_task(check_claim(claim)) for claim in claims]
+        try:
+            claim_details = []
+            for future in asyncio.as_completed(claim_tasks):
+                claim, queries, evidences = await future
+                claim2doc = await restore_task
+                if claim not in claim2doc:
+                    continue
+                _, claim2checkworthy = await checkworthy_task
+                claim_obj = self._make_claim_detail(
+                    list(claim2doc).index(claim),
+                    claim,
+                    claim2doc[claim],
+                    claim2checkworthy,
+                    queries=queries,
+                    evidences=evidences,
+                )
+                logger.info(f"== Claim {claim_obj.id} done after {time.time()-st_time:.2f}s: {claim}")
+                claim_details.append(claim_obj)
+                yield claim_obj
+        finally:
+            for task in [restore_task, checkworthy_task, *claim_tasks]:
+                task.cancel()
+
+        logger.info(f"== State: Done! \n Total time: {time.time()-st_time:.2f}s.")
+        claim_details.sort(key=lambda x: x.id)
+        yield self._finalize_factcheck(raw_text=raw_text, claim_detail=claim_details, return_dict=False).summary
+
+    def check_texts(self, raw_texts: list[str], max_concurrency: int = 8) -> dict:
+        return run_sync(self.acheck_texts(raw_texts, max_concurrency=max_concurrency))
+
+    async def acheck_texts(self, raw_texts: list[str], max_concurrency: int = 8) -> dict:
+        """Fact-check a batch of documents in one pipelined run.
+
+        The per-document front of the pipeline (decompose, restore and checkworthy) runs for up to
+        `max_concurrency` documents at a time, while the remaining steps (query generation, evidence
+        retrieval and verification) are pooled over waves of `max_concurrency` documents, so that LLM
+        `multi_call` batches and Serper query batches are shared across documents. The front of the
+        next wave keeps running while the current wave is being retrieved and verified.
+
+        Args:
+            raw_texts (list[str]): the documents to be fact-checked.
+            max_concurrency (int, optional): maximum number of documents in flight. Defaults to 8.
+
+        In offline batch mode, the requests go through the batch backend, but the pipeline state of the
+        documents is not persisted between stages: use `check_text` to resume documents after a restart.
+
+        Returns:
+            dict: the fact-check result of each document in "results", in the same order as `raw_texts`, and
+                the usage of the whole batch in "usage", since LLM calls are shared across documents. A document
+                which failed is not retried, its result is {"raw_text", "error"} with the repr of the error.
+        """
+        assert max_concurrency >= 1, "max_concurrency must be a positive integer."
+        self._reset_usage()
+        if self.offline_batch is not None:
+            logger.warning("== Batch: the pipeline state of the documents is not persisted by check_texts.")
+
+        st_time = time.time()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def bounded_front(raw_text):
+            async with semaphore:
+                return await self._check_text_front(raw_text)
+
+        wave_results = []
+        tasks = [asyncio.create_task(bounded_front(raw_text)) for raw_text in raw_texts]
+        try:
+            for i in range(0, len(tasks), max_concurrency):
+                # a failed document must not fail the batch, only the other documents go to the back stage
+                fronts = await asyncio.gather(*tasks[i : i + max_concurrency], return_exceptions=True)
+                checked = [front for front in fronts if not isinstance(front, BaseException)]
+                try:
+                    backs = iter(await self._check_text_back(checked))
+                except Exception as e:
+                    logger.error(f"== Batch: documents {i}-{i + len(fronts) - 1} failed: {e!r}")
+                    backs = iter([e] * len(checked))
+                for j, front in enumerate(fronts):
+                    if isinstance(front, BaseException):
+                        logger.error(f"== Batch: document {i + j} failed: {front!r}")
+                    wave_results.append(front if isinstance(front, BaseException) else next(backs))
+                logger.info(f"== Batch: {min(i + max_concurrency, len(raw_texts))}/{len(raw_texts)} documents checked.")
+        finally:
+            for task in tasks:
+                task.cancel()
+        num_failed = sum(isinstance(result, BaseException) for result in wave_results)
+        logger.info(
+            f"== State: Batch done! Total time: {time.time()-st_time:.2f}s for {len(raw_texts)} documents, "
+            f"{num_failed} failed."
+        )
+
+        results = []
+        for raw_text, claim_detail in zip(raw_texts, wave_results):
+            if isinstance(claim_detail, BaseException):
+                results.append({"raw_text": raw_text, "error": repr(claim_detail)})
+                continue
+            result = self._finalize_factcheck(raw_text=raw_text, claim_detail=claim_detail, return_dict=True)
+            # the usage is shared by the whole batch, it is reported once
+            del result["usage"]
+            results.append(result)
+        return {"results": results, "usage": asdict(self._get_usage())}
+
+    async def _check_text_front(self, raw_text: str) -> dict:
+        """Run the per-document steps of the pipeline: decompose, restore claims and checkworthiness."""
+        claims = await self.decomposer.agetclaims(doc=raw_text, num_retries=self.num_seed_retries)
+        claim2doc, (checkworthy_claims, claim2checkworthy) = await asyncio.gather(
+            self.decomposer.arestore_claims(doc=raw_text, claims=claims, num_retries=self.num_seed_retries),
+            self.checkworthy.aidentify_checkworthiness(claims, num_retries=self.num_seed_retries),
+        )
+        return {
+            "claim2doc": claim2doc,
+            "checkworthy_claims": checkworthy_claims,
+            "claim2checkworthy": claim2checkworthy,
+        }
+
+    async def _check_text_back(self, fronts: list[dict]) -> list[list[ClaimDetail]]:
+        """Run query generation, evidence retrieval and verification pooled over several documents.
+
+        Claims are keyed by their text, so a claim shared by several documents is only checked once.
+        """
+        pooled_claims = list(dict.fromkeys(claim for front in fronts for claim in front["checkworthy_claims"]))
+        if pooled_claims:
+            claim_queries_dict = await self.query_generator.agenerate_query(claims=pooled_claims)
+            claim_evidences_dict = await self.evidence_crawler.aretrieve_evidence(claim_queries_dict=claim_queries_dict)
+            claim_verifications_dict = await self.claimverify.averify_claims(claim_evidences_dict=claim_evidences_dict)
+        else:
+            claim_queries_dict, claim_evidences_dict, claim_verifications_dict = {}, {}, {}
+
+        claim_details = []
+        for front in fronts:
+            checkworthy_claims_S = set(front["checkworthy_claims"])
+            claim_details.append(
+                self._merge_claim_details(
+                    claim2doc=front["claim2doc"],
+                    claim2checkworthy=front["claim2checkworthy"],
+                    claim2queries={k: v for k, v in claim_queries_dict.items() if k in checkworthy_claims_S},
+                    claim2evidences={k: v for k, v in claim_evidences_dict.items() if k in checkworthy_claims_S},
+                    claim2verifications={k: v for k, v in claim_verifications_dict.items() if k in checkworthy_claims_S},
+                )
+            )
+        return claim_details
+
     def _get_usage(self):
         return PipelineUsage(**{attr: getattr(self, attr).llm_client.usage for attr in self.attr_list})
 
@@ -160,42 +525,51 @@ class FactCheck:
             if claim in claim2verifications:
                 assert claim in claim2queries, f"Claim {claim} not found in claim2queries."
                 assert claim in claim2evidences, f"Claim {claim} not found in claim2evidences."
-
-                evidences = claim2verifications.get(claim, {})
-                labels = list(map(lambda x: x.relationship, evidences))
-                if labels.count("SUPPORTS") + labels.count("REFUTES") == 0:
-                    factuality = "No evidence found."
-                else:
-                    factuality = labels.count("SUPPORTS") / (labels.count("REFUTES") + labels.count("SUPPORTS"))
-
-                claim_obj = ClaimDetail(
-                    id=i,
-                    claim=claim,
-                    checkworthy=True,
-                    checkworthy_reason=claim2checkworthy.get(claim, "No reason provided, please report issue."),
-                    origin_text=origin["text"],
-                    start=origin["start"],
-                    end=origin["end"],
-                    queries=claim2queries[claim],
-                    evidences=evidences,
-                    factuality=factuality,
+                claim_obj = self._make_claim_detail(
+                    i, claim, origin, claim2checkworthy, queries=claim2queries[claim], evidences=claim2verifications[claim]
                 )
             else:
-                claim_obj = ClaimDetail(
-                    id=i,
-                    claim=claim,
-                    checkworthy=False,
-                    checkworthy_reason=claim2checkworthy.get(claim, "No reason provided, please report issue."),
-                    origin_text=origin["text"],
-                    start=origin["start"],
-                    end=origin["end"],
-                    queries=[],
-                    evidences=[],
-                    factuality="Nothing to check.",
-                )
+                claim_obj = self._make_claim_detail(i, claim, origin, claim2checkworthy)
             claim_details.append(claim_obj)
         return claim_details
 
+    def _make_claim_detail(
+        self, i: int, claim: str, origin: dict, claim2checkworthy: dict, queries: list = None, evidences: list = None
+    ) -> ClaimDetail:
+        """Build the detail of a single claim, claims without verified evidences are not checkworthy."""
+        if evidences is not None:
+            labels = list(map(lambda x: x.relationship, evidences))
+            if labels.count("SUPPORTS") + labels.count("REFUTES") == 0:
+                factuality = "No evidence found."
+            else:
+                factuality = labels.count("SUPPORTS") / (labels.count("REFUTES") + labels.count("SUPPORTS"))
+
+            return ClaimDetail(
+                id=i,
+                claim=claim,
+                checkworthy=True,
+                checkworthy_reason=claim2checkworthy.get(claim, "No reason provided, please report issue."),
+                origin_text=origin["text"],
+                start=origin["start"],
+                end=origin["end"],
+                queries=queries,
+                evidences=evidences,
+                factuality=factuality,
+            )
+        else:
+            return ClaimDetail(
+                id=i,
+                claim=claim,
+                checkworthy=False,
+                checkworthy_reason=claim2checkworthy.get(claim, "No reason provided, please report issue."),
+                origin_text=origin["text"],
+                start=origin["start"],
+                end=origin["end"],
+                queries=[],
+                evidences=[],
+                factuality="Nothing to check.",
+            )
+
     def _finalize_factcheck(
         self, raw_text: str, claim_detail: list[ClaimDetail] = None, return_dict: bool = True
     ) -> FactCheckOutput:
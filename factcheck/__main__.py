@@ -4,6 +4,7 @@ import argparse
 from factcheck.utils.llmclient import CLIENTS
 from factcheck.utils.multimodal import modal_normalization
 from factcheck.utils.utils import load_yaml
+from factcheck.utils.cassette import use_cassette
 from factcheck import FactCheck
 
 
@@ -27,7 +28,12 @@ def check(args):
     )
 
     content = modal_normalization(args.modal, args.input)
-    res = factcheck.check_text(content)
+    if args.cassette is not None:
+        # record or replay all LLM calls, search requests and crawled pages
+        with use_cassette(args.cassette, mode=args.cassette_mode, replay_latency=args.replay_latency):
+            res = factcheck.check_text(content)
+    else:
+        res = factcheck.check_text(content)
     print(json.dumps(res, indent=4))
 
     # Save the results to lark (only for local testing)
@@ -48,6 +54,9 @@ if __name__ == "__main__":
     parser.add_argument("--modal", type=str, default="text")
     parser.add_argument("--input", type=str, default="demo_data/text.txt")
     parser.add_argument("--api_config", type=str, default="factcheck/config/api_config.yaml")
+    parser.add_argument("--cassette", type=str, default=None)
+    parser.add_argument("--cassette_mode", type=str, default="replay", choices=["record", "replay"])
+    parser.add_argument("--replay_latency", action="store_true")
     args = parser.parse_args()
 
     check(args)
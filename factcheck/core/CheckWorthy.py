@@ -1,22 +1,47 @@
 from factcheck.utils.logger import CustomLogger
+from factcheck.utils.async_util import run_sync
+from factcheck.utils.output_parser import parse_llm_output
+from factcheck.utils.checkworthy_filter import CheckworthyFilter
 
 logger = CustomLogger(__name__).getlog()
 
 
 class Checkworthy:
-    def __init__(self, llm_client, prompt):
+    def __init__(
+        self,
+        llm_client,
+        prompt,
+        group_size: int = 10,
+        prefilter: CheckworthyFilter = None,
+        prefilter_threshold: float = 0.9,
+    ):
         """Initialize the Checkworthy class
 
         Args:
             llm_client (BaseClient): The LLM client used for identifying checkworthiness of claims.
             prompt (BasePrompt): The prompt used for identifying checkworthiness of claims.
+            group_size (int, optional): the number of claims per prompt, groups are sent concurrently. Defaults to 10.
+            prefilter (CheckworthyFilter, optional): decides clear-cut claims locally, only the other claims are sent
+                to the LLM. Defaults to None.
+            prefilter_threshold (float, optional): the minimum confidence of a local decision. Defaults to 0.9.
         """
         self.llm_client = llm_client
         self.prompt = prompt
+        self.group_size = group_size
+        self.prefilter = prefilter
+        self.prefilter_threshold = prefilter_threshold
 
     def identify_checkworthiness(self, texts: list[str], num_retries: int = 3, prompt: str = None) -> list[str]:
+        """Blocking version of `aidentify_checkworthiness`."""
+        return run_sync(self.aidentify_checkworthiness(texts, num_retries=num_retries, prompt=prompt))
+
+    async def aidentify_checkworthiness(self, texts: list[str], num_retries: int = 3, prompt: str = None) -> list[str]:
         """Use GPT to identify whether candidate claims are worth fact checking. if gpt is unable to return correct checkworthy_claims, we assume all texts are checkworthy.
 
+        Claims are split into groups of `group_size`, sent concurrently; only the groups whose output is invalid
+        (unparsable, not a Yes/No answer, or missing claims) are retried. Claims decided by the prefilter with
+        enough confidence are not sent to the LLM.
+
         Args:
             texts (list[str]): a list of texts to identify whether they are worth fact checking
             num_retries (int, optional): maximum attempts for GPT to identify checkworthy claims. Defaults to 3.
@@ -24,30 +49,63 @@ class Checkworthy:
         Returns:
             list[str]: a list of checkworthy claims, pairwise outputs
         """
-        checkworthy_claims = texts
-        joint_texts = "\n".join([str(i + 1) + ". " + j for i, j in enumerate(texts)])
+        local_answers = self._prefilter(texts)
+        llm_texts = [text for text in dict.fromkeys(texts) if text not in local_answers]
+        groups = [llm_texts[i : i + self.group_size] for i in range(0, len(llm_texts), self.group_size)]
+        user_inputs = []
+        for group in groups:
+            joint_texts = "\n".join([str(i + 1) + ". " + j for i, j in enumerate(group)])
+            if prompt is None:
+                user_inputs.append(self.prompt.checkworthy_prompt.format(texts=joint_texts))
+            else:
+                user_inputs.append(prompt.format(texts=joint_texts))
 
-        if prompt is None:
-            user_input = self.prompt.checkworthy_prompt.format(texts=joint_texts)
-        else:
-            user_input = prompt.format(texts=joint_texts)
-
-        messages = self.llm_client.construct_message_list([user_input])
+        # the answers of each group, partial until the group output is valid
+        group_answers = [{} for _ in groups]
+        pending = list(range(len(groups)))
         for i in range(num_retries):
-            response = self.llm_client.call(messages, num_retries=1, seed=42 + i)
-            try:
-                claim2checkworthy = eval(response)
-                valid_answer = list(
-                    filter(
-                        lambda x: x[1].startswith("Yes") or x[1].startswith("No"),
-                        claim2checkworthy.items(),
-                    )
-                )
-                checkworthy_claims = list(filter(lambda x: x[1].startswith("Yes"), claim2checkworthy.items()))
-                checkworthy_claims = list(map(lambda x: x[0], checkworthy_claims))
-                assert len(valid_answer) == len(claim2checkworthy)
+            if not pending:
                 break
-            except Exception as e:
-                logger.error(f"====== Error: {e}, the LLM response is: {response}")
-                logger.error(f"====== Our input is: {messages}")
+            messages_list = self.llm_client.construct_message_list([user_inputs[j] for j in pending])
+            responses = await self.llm_client.amulti_call(messages_list, num_retries=1, seed=42 + i)
+            failed = []
+            for j, response in zip(pending, responses):
+                try:
+                    claim2checkworthy = parse_llm_output(response, {str: str}, usage=self.llm_client.usage)
+                    answers = {
+                        claim: reason
+                        for claim, reason in claim2checkworthy.items()
+                        if claim in groups[j] and (reason.startswith("Yes") or reason.startswith("No"))
+                    }
+                    group_answers[j].update(answers)
+                    assert len(answers) == len(claim2checkworthy), "Invalid answers."
+                    assert len(group_answers[j]) == len(set(groups[j])), "Missing claims."
+                except Exception as e:
+                    failed.append(j)
+                    logger.error(f"====== Error: {e}, the LLM response is: {response}")
+                    logger.error(f"====== Our input is: {user_inputs[j]}")
+            pending = failed
+
+        # claims without a valid answer are assumed to be checkworthy
+        answers = {claim: reason for group in group_answers for claim, reason in group.items()}
+        answers.update(local_answers)
+        claim2checkworthy = {text: answers[text] for text in dict.fromkeys(texts) if text in answers}
+        checkworthy_claims = [text for text in dict.fromkeys(texts) if claim2checkworthy.get(text, "Yes").startswith("Yes")]
         return checkworthy_claims, claim2checkworthy
+
+    def _prefilter(self, texts: list[str]) -> dict[str, str]:
+        """Decide the checkworthiness of clear-cut claims with the prefilter, counted in `usage.local_decisions`.
+
+        Returns:
+            dict: the claims decided locally and their reasons, in the format of the LLM answers.
+        """
+        if self.prefilter is None or not texts:
+            return {}
+        claims = list(dict.fromkeys(texts))
+        local_answers = {}
+        for claim, (checkworthy, confidence, reason) in zip(claims, self.prefilter.classify(claims)):
+            if checkworthy is not None and confidence >= self.prefilter_threshold:
+                local_answers[claim] = f"{'Yes' if checkworthy else 'No'} (decided locally: {reason})"
+        self.llm_client.usage.local_decisions += len(local_answers)
+        logger.info(f"== {len(local_answers)} of {len(claims)} claims decided locally by the checkworthiness prefilter.")
+        return local_answers
@@ -1,24 +1,82 @@
 from __future__ import annotations
 
-import json
+from typing import Callable
+
 from factcheck.utils.logger import CustomLogger
 from factcheck.utils.data_class import Evidence
+from factcheck.utils.async_util import run_sync
+from factcheck.utils.output_parser import parse_llm_output, validate_schema
+from factcheck.utils.batch import OfflineBatch
+from factcheck.utils.near_dup import cluster_near_duplicates
+from factcheck.core.EvidenceGate import EvidenceGate
 
 logger = CustomLogger(__name__).getlog()
 
 
+class AgreementRule:
+    def __init__(self, min_agreeing: int = 3, max_contradicting: int = 0):
+        """Early exit rule of `ClaimVerify`: the verdict of a claim is settled once `min_agreeing` evidences
+        agree (SUPPORTS or REFUTES), and at most `max_contradicting` evidences contradict them.
+
+        Args:
+            min_agreeing (int, optional): the number of agreeing verdicts. Defaults to 3.
+            max_contradicting (int, optional): the number of contradicting verdicts tolerated. Defaults to 0.
+        """
+        self.min_agreeing = min_agreeing
+        self.max_contradicting = max_contradicting
+
+    def __call__(self, verdicts: list[str]) -> bool:
+        supports, refutes = verdicts.count("SUPPORTS"), verdicts.count("REFUTES")
+        return (supports >= self.min_agreeing and refutes <= self.max_contradicting) or (
+            refutes >= self.min_agreeing and supports <= self.max_contradicting
+        )
+
+
 class ClaimVerify:
-    def __init__(self, llm_client, prompt):
+    def __init__(
+        self,
+        llm_client,
+        prompt,
+        offline_batch=None,
+        verify_per_claim: bool = False,
+        early_exit_rule: Callable[[list[str]], bool] = None,
+        wave_size: int = 3,
+        evidence_gate: EvidenceGate = None,
+        dedup_max_distance: int = None,
+    ):
         """Initialize the ClaimVerify class
 
         Args:
             llm_client (BaseClient): The LLM client used for verifying the factuality of claims.
             prompt (BasePrompt): The prompt used for verifying the factuality of claims.
+            offline_batch (OfflineBatch, optional): send the requests through a batch backend. Defaults to None.
+            verify_per_claim (bool, optional): judge all evidences of a claim in one call with `verify_batch_prompt`,
+                instead of one call per evidence. Defaults to False.
+            early_exit_rule (Callable, optional): verify the evidences of a claim by descending retrieval score, in
+                waves, until the rule returns True for the verdicts so far, e.g. `AgreementRule()`. Defaults to None,
+                i.e. verify all evidences.
+            wave_size (int, optional): the number of evidences of a claim verified per wave. Defaults to 3.
+            evidence_gate (EvidenceGate, optional): drop the evidences scored as irrelevant by a local model before
+                verification. Defaults to None.
+            dedup_max_distance (int, optional): verify one representative of each cluster of near-duplicate evidences
+                of a claim, whose SimHash fingerprints differ by at most this number of bits and whose word shingles
+                are confirmed to be near-identical, and give its verdict to the whole cluster. Defaults to None,
+                i.e. verify every evidence.
         """
         self.llm_client = llm_client
         self.prompt = prompt
+        self.offline_batch = offline_batch
+        self.verify_per_claim = verify_per_claim
+        self.early_exit_rule = early_exit_rule
+        self.wave_size = wave_size
+        self.evidence_gate = evidence_gate
+        self.dedup_max_distance = dedup_max_distance
 
     def verify_claims(self, claim_evidences_dict, prompt: str = None) -> dict[str, list[Evidence]]:
+        """Blocking version of `averify_claims`."""
+        return run_sync(self.averify_claims(claim_evidences_dict, prompt=prompt))
+
+    async def averify_claims(self, claim_evidences_dict, prompt: str = None) -> dict[str, list[Evidence]]:
         """Verify the factuality of the claims with respect to the given evidences
 
         Args:
@@ -28,11 +86,79 @@ class ClaimVerify:
             dict: a dictionary of claims and their relationship to each evidence, including evidence, reasoning, relationship.
         """
 
-        claim_verifications_dict = self._verify_all_claims(claim_evidences_dict, prompt=prompt)
+        all_evidences_dict, claim2representatives = claim_evidences_dict, None
+        if self.dedup_max_distance is not None:
+            claim_evidences_dict, claim2representatives = self._collapse_near_duplicates(claim_evidences_dict)
+
+        dropped_dict = {}
+        if self.evidence_gate is not None:
+            claim_evidences_dict, dropped_dict = await self.evidence_gate.agate(claim_evidences_dict)
+
+        claim_verifications_dict = await self._verify_all_claims(claim_evidences_dict, prompt=prompt)
+
+        # the dropped evidences are kept in the output, so that the recall of the gate can be audited
+        for claim, dropped in dropped_dict.items():
+            self.llm_client.usage.calls_saved += len(dropped)
+            self.llm_client.usage.gate_calls_saved += len(dropped)
+            for evidence, score in dropped:
+                claim_verifications_dict[claim].append(
+                    Evidence(
+                        claim=claim,
+                        text=evidence["text"],
+                        url=evidence["url"],
+                        reasoning=f"[System] Not verified, dropped by the evidence gate with the relevance score {score:.3f}.",
+                        relationship="DROPPED",
+                    )
+                )
 
+        if claim2representatives is not None:
+            claim_verifications_dict = self._fan_out(all_evidences_dict, claim2representatives, claim_verifications_dict)
         return claim_verifications_dict
 
-    def _verify_all_claims(
+    def _collapse_near_duplicates(self, claim_evidences_dict: dict[str, list[dict]]) -> tuple[dict, dict]:
+        """Keep one representative per cluster of near-duplicate evidences of each claim, see `cluster_near_duplicates`.
+
+        Returns:
+            tuple: the claims and their representative evidences, and the claims and the index of the
+                representative of each of their evidences.
+        """
+        collapsed_dict, claim2representatives = {}, {}
+        for claim, evidences in claim_evidences_dict.items():
+            representatives = cluster_near_duplicates([e["text"] for e in evidences], max_distance=self.dedup_max_distance)
+            claim2representatives[claim] = representatives
+            collapsed_dict[claim] = [e for i, e in enumerate(evidences) if representatives[i] == i]
+            num_duplicates = len(evidences) - len(collapsed_dict[claim])
+            if num_duplicates:
+                self.llm_client.usage.calls_saved += num_duplicates
+                self.llm_client.usage.dedup_calls_saved += num_duplicates
+                logger.info(f"== Collapsed {num_duplicates} near-duplicate evidences for claim: {claim}")
+        return collapsed_dict, claim2representatives
+
+    def _fan_out(
+        self, claim_evidences_dict: dict, claim2representatives: dict, claim_verifications_dict: dict
+    ) -> dict[str, list[Evidence]]:
+        """Give each near-duplicate evidence the verdict of its representative, in the original evidence order."""
+        fanned_out_dict = {}
+        for claim, evidences in claim_evidences_dict.items():
+            verified = {(e.text, e.url): e for e in claim_verifications_dict[claim]}
+            fanned_out_dict[claim] = []
+            for evidence, i in zip(evidences, claim2representatives[claim]):
+                verification = verified[(evidences[i]["text"], evidences[i]["url"])]
+                if evidences[i] is evidence:
+                    fanned_out_dict[claim].append(verification)
+                    continue
+                fanned_out_dict[claim].append(
+                    Evidence(
+                        claim=claim,
+                        text=evidence["text"],
+                        url=evidence["url"],
+                        reasoning=verification.reasoning,
+                        relationship=verification.relationship,
+                    )
+                )
+        return fanned_out_dict
+
+    async def _verify_all_claims(
         self,
         claim_evidences_dict: dict[str, list[str]],
         num_retries=3,
@@ -47,34 +173,11 @@ class ClaimVerify:
         Returns:
             list[dict[str, any]]: a list of relationship results, including evidence, reasoning, relationship.
         """
-        attempts = 0
-        # construct user inputs with respect to each claim and its evidences
-        claim_evidence_list = []
-        messages_list = []
-        for claim, _evidences in claim_evidences_dict.items():
-            for e in _evidences:
-                if prompt is None:
-                    user_input = self.prompt.verify_prompt.format(claim=claim, evidence=e)
-                else:
-                    user_input = prompt.format(claim=claim, evidence=e)
-                claim_evidence_list.append((claim, e))
-                messages_list.append(user_input)
-        factual_results = [None] * len(messages_list)
-
-        while (attempts < num_retries) and (None in factual_results):
-            _messages = [_message for _i, _message in enumerate(messages_list) if factual_results[_i] is None]
-            _indices = [_i for _i, _message in enumerate(messages_list) if factual_results[_i] is None]
-
-            _message_list = self.llm_client.construct_message_list(_messages)
-            _response_list = self.llm_client.multi_call(_message_list)
-            for _response, _index in zip(_response_list, _indices):
-                try:
-                    _response_json = json.loads(_response)
-                    assert all(k in _response_json for k in ["reasoning", "relationship"])
-                    factual_results[_index] = _response_json
-                except:  # noqa: E722
-                    logger.info(f"Warning: LLM response parse fail, retry {attempts}.")
-            attempts += 1
+        claim_evidence_list = [(claim, e) for claim, _evidences in claim_evidences_dict.items() for e in _evidences]
+        if self.early_exit_rule is None:
+            factual_results = await self._verify_pairs(claim_evidence_list, num_retries=num_retries, prompt=prompt)
+        else:
+            factual_results = await self._verify_by_rank(claim_evidence_list, num_retries=num_retries, prompt=prompt)
 
         _template_results = {
             "reasoning": "[System Warning] Can not identify the factuality of the claim.",
@@ -87,7 +190,7 @@ class ClaimVerify:
             # if cannot get correct response within num_retries times.
             if verification is None:
                 verification = _template_results
-            evidences.append(Evidence(claim=claim, **evidence, **verification))
+            evidences.append(Evidence(claim=claim, text=evidence["text"], url=evidence["url"], **verification))
 
         # aggregate the results from list to dict
         claim_verifications_dict = {k: [] for k in claim_evidences_dict.keys()}
@@ -95,3 +198,122 @@ class ClaimVerify:
             claim_verifications_dict[e.claim].append(e)
 
         return claim_verifications_dict
+
+    async def _verify_pairs(self, claim_evidence_list: list[tuple], num_retries=3, prompt: str = None) -> list[dict]:
+        """Verify (claim, evidence) pairs, None for the pairs which could not be verified within num_retries."""
+        attempts = 0
+        # construct user inputs with respect to each claim and its evidences
+        messages_list = []
+        for claim, e in claim_evidence_list:
+            evidence = {k: e[k] for k in ("text", "url") if k in e}
+            if prompt is None:
+                user_input = self.prompt.verify_prompt.format(claim=claim, evidence=evidence)
+            else:
+                user_input = prompt.format(claim=claim, evidence=evidence)
+            messages_list.append(user_input)
+        factual_results = [None] * len(messages_list)
+
+        # one call per claim first, the evidences missing from its response are verified one by one
+        batch_prompt = getattr(self.prompt, "verify_batch_prompt", None)
+        if self.verify_per_claim and prompt is None and batch_prompt is not None:
+            factual_results = await self._verify_per_claim(claim_evidence_list, batch_prompt)
+
+        while (attempts < num_retries) and (None in factual_results):
+            _messages = [_message for _i, _message in enumerate(messages_list) if factual_results[_i] is None]
+            _indices = [_i for _i, _message in enumerate(messages_list) if factual_results[_i] is None]
+
+            _message_list = self.llm_client.construct_message_list(_messages)
+            _response_list = await OfflineBatch.amulti_call_or_interactive(
+                self.offline_batch, self.llm_client, _message_list, seed=42 + attempts
+            )
+            for _response, _index in zip(_response_list, _indices):
+                try:
+                    factual_results[_index] = parse_llm_output(
+                        _response, {"reasoning": str, "relationship": str}, usage=self.llm_client.usage
+                    )
+                except:  # noqa: E722
+                    logger.info(f"Warning: LLM response parse fail, retry {attempts}.")
+            attempts += 1
+        return factual_results
+
+    async def _verify_by_rank(self, claim_evidence_list: list[tuple], num_retries=3, prompt: str = None) -> list[dict]:
+        """Verify the evidences of each claim in descending retrieval score, in waves of `wave_size` evidences,
+        until `early_exit_rule` is met. The waves of all claims are verified concurrently, and the evidences
+        left once the rule is met are marked as skipped."""
+        claim2indices = {}
+        for i, (claim, evidence) in enumerate(claim_evidence_list):
+            claim2indices.setdefault(claim, []).append(i)
+        for claim, indices in claim2indices.items():
+            # evidences without a score keep their retrieval order
+            indices.sort(key=lambda i: -claim_evidence_list[i][1].get("score", 0))
+
+        factual_results = [None] * len(claim_evidence_list)
+        verified = {claim: 0 for claim in claim2indices}
+        while True:
+            wave = []
+            for claim, indices in claim2indices.items():
+                if verified[claim] == len(indices):
+                    continue
+                verdicts = [(factual_results[i] or {}).get("relationship") for i in indices[: verified[claim]]]
+                if verified[claim] > 0 and self.early_exit_rule(verdicts):
+                    continue
+                wave += indices[verified[claim] : verified[claim] + self.wave_size]
+                verified[claim] = min(len(indices), verified[claim] + self.wave_size)
+            if not wave:
+                break
+            results = await self._verify_pairs([claim_evidence_list[i] for i in wave], num_retries=num_retries, prompt=prompt)
+            for i, result in zip(wave, results):
+                factual_results[i] = result
+
+        for claim, indices in claim2indices.items():
+            skipped = indices[verified[claim] :]
+            for i in skipped:
+                factual_results[i] = {
+                    "reasoning": "[System] Not verified, the verdict was settled by higher ranked evidences.",
+                    "relationship": "SKIPPED",
+                }
+            if skipped:
+                self.llm_client.usage.calls_saved += len(skipped)
+                self.llm_client.usage.early_exit_calls_saved += len(skipped)
+                logger.info(f"== Early exit after {verified[claim]} of {len(indices)} evidences for claim: {claim}")
+        return factual_results
+
+    async def _verify_per_claim(self, claim_evidence_list: list[tuple], batch_prompt: str) -> list[dict]:
+        """Verify all evidences of each claim in one call, the output is keyed by evidence number.
+
+        Args:
+            claim_evidence_list (list[tuple]): the (claim, evidence) pairs, grouped by claim.
+            batch_prompt (str): the prompt listing the numbered evidences of a claim.
+
+        Returns:
+            list[dict]: the verification of each pair, None if it is missing from the response.
+        """
+        claim2indices = {}
+        for i, (claim, _) in enumerate(claim_evidence_list):
+            claim2indices.setdefault(claim, []).append(i)
+        user_inputs = []
+        for claim, indices in claim2indices.items():
+            evidences = "\n".join([f"{n + 1}. {claim_evidence_list[i][1]['text']}" for n, i in enumerate(indices)])
+            user_inputs.append(batch_prompt.format(claim=claim, evidences=evidences))
+        responses = await OfflineBatch.amulti_call_or_interactive(
+            self.offline_batch, self.llm_client, self.llm_client.construct_message_list(user_inputs), seed=42
+        )
+
+        factual_results = [None] * len(claim_evidence_list)
+        for indices, response in zip(claim2indices.values(), responses):
+            try:
+                number2result = parse_llm_output(response, dict, usage=self.llm_client.usage)
+            except ValueError as e:
+                logger.info(f"Warning: LLM response parse fail for the {len(indices)} evidences of a claim: {e}")
+                continue
+            # keep the items which parsed correctly, even if others are missing or malformed
+            for n, i in enumerate(indices):
+                result = number2result.get(str(n + 1))
+                try:
+                    factual_results[i] = validate_schema(result, {"reasoning": str, "relationship": str})
+                except ValueError:
+                    continue
+        missing = factual_results.count(None)
+        if missing:
+            logger.info(f"Warning: {missing} evidences missing from the per-claim responses, verify them one by one.")
+        return factual_results
@@ -1,19 +1,40 @@
 from factcheck.utils.logger import CustomLogger
+from factcheck.utils.async_util import run_sync
+from factcheck.utils.output_parser import parse_llm_output
+from factcheck.utils.span_aligner import align_claims, sentence_spans
+from factcheck.utils.llmclient.base import count_tokens
 import nltk
+import asyncio
 
 logger = CustomLogger(__name__).getlog()
 
 
 class Decompose:
-    def __init__(self, llm_client, prompt):
+    def __init__(
+        self,
+        llm_client,
+        prompt,
+        local_restore: bool = True,
+        restore_min_confidence: float = 0.5,
+        shard_max_tokens: int = None,
+    ):
         """Initialize the Decompose class
 
         Args:
             llm_client (BaseClient): The LLM client used for decomposing documents into claims.
             prompt (BasePrompt): The prompt used for fact checking.
+            local_restore (bool, optional): map claims back to the document with the local span aligner first,
+                and only ask the LLM if the alignment confidence is low. Defaults to True.
+            restore_min_confidence (float, optional): the minimum fraction of the distinctive content words of
+                every claim which has to be found in its span to accept the local alignment. Defaults to 0.5.
+            shard_max_tokens (int, optional): decompose documents longer than this number of tokens in shards of
+                whole sentences, each within this budget, in parallel. Defaults to None, i.e. never shard.
         """
         self.llm_client = llm_client
         self.prompt = prompt
+        self.local_restore = local_restore
+        self.restore_min_confidence = restore_min_confidence
+        self.shard_max_tokens = shard_max_tokens
         self.doc2sent = self._nltk_doc2sent
 
     def _nltk_doc2sent(self, text: str):
@@ -30,7 +51,33 @@ class Decompose:
         sentence_list = [s.strip() for s in sentences if len(s.strip()) >= 3]
         return sentence_list
 
+    def _shard_doc(self, doc: str) -> list[tuple[int, int]]:
+        """Split a document into consecutive shards of whole sentences, each within `shard_max_tokens` tokens
+        (a longer sentence is a shard on its own).
+
+        Returns:
+            list: the (start, end) offsets of the shards, which cover the document.
+        """
+        shards, start, num_tokens = [], 0, 0
+        for st, ed in sentence_spans(doc):
+            sentence_tokens = count_tokens(doc[st:ed])
+            if num_tokens > 0 and num_tokens + sentence_tokens > self.shard_max_tokens:
+                shards.append((start, st))
+                start, num_tokens = st, 0
+            num_tokens += sentence_tokens
+        shards.append((start, len(doc)))
+        return shards
+
+    def _is_sharded(self, doc: str) -> bool:
+        if self.shard_max_tokens is None or count_tokens(doc) <= self.shard_max_tokens:
+            return False
+        return len(self._shard_doc(doc)) > 1
+
     def getclaims(self, doc: str, num_retries: int = 3, prompt: str = None) -> list[str]:
+        """Blocking version of `agetclaims`."""
+        return run_sync(self.agetclaims(doc=doc, num_retries=num_retries, prompt=prompt))
+
+    async def agetclaims(self, doc: str, num_retries: int = 3, prompt: str = None) -> list[str]:
         """Use GPT to decompose a document into claims
 
         Args:
@@ -40,6 +87,9 @@ class Decompose:
         Returns:
             list: a list of claims
         """
+        if self._is_sharded(doc):
+            return await self._agetclaims_sharded(doc, num_retries=num_retries, prompt=prompt)
+
         if prompt is None:
             user_input = self.prompt.decompose_prompt.format(doc=doc).strip()
         else:
@@ -48,13 +98,13 @@ class Decompose:
         claims = None
         messages = self.llm_client.construct_message_list([user_input])
         for i in range(num_retries):
-            response = self.llm_client.call(
+            response = await self.llm_client.acall(
                 messages=messages,
                 num_retries=1,
                 seed=42 + i,
             )
             try:
-                claims = eval(response)["claims"]
+                claims = parse_llm_output(response, {"claims": [str]}, usage=self.llm_client.usage)["claims"]
                 if isinstance(claims, list) and len(claims) > 0:
                     break
             except Exception as e:
@@ -67,7 +117,40 @@ class Decompose:
             claims = self.doc2sent(doc)
         return claims
 
+    async def _agetclaims_sharded(self, doc: str, num_retries: int = 3, prompt: str = None) -> list[str]:
+        """Decompose the shards of a long document in parallel, only retrying the shards which failed,
+        and merge their claims in document order."""
+        shards = [doc[st:ed] for st, ed in self._shard_doc(doc)]
+        template = self.prompt.decompose_prompt if prompt is None else prompt
+        user_inputs = [template.format(doc=shard).strip() for shard in shards]
+        logger.info(f"== Decomposing the document in {len(shards)} shards of up to {self.shard_max_tokens} tokens.")
+
+        shard_claims = [None] * len(shards)
+        for i in range(num_retries):
+            pending = [j for j, claims in enumerate(shard_claims) if claims is None]
+            if not pending:
+                break
+            messages_list = self.llm_client.construct_message_list([user_inputs[j] for j in pending])
+            responses = await self.llm_client.amulti_call(messages_list, seed=42 + i)
+            for j, response in zip(pending, responses):
+                try:
+                    claims = parse_llm_output(response, {"claims": [str]}, usage=self.llm_client.usage)["claims"]
+                    if len(claims) > 0:
+                        shard_claims[j] = claims
+                except Exception as e:
+                    logger.error(f"Parse LLM response error {e} for shard {j}, response is: {response}")
+
+        for j, claims in enumerate(shard_claims):
+            if claims is None:
+                logger.info(f"It does not output a list of sentences correctly for shard {j}, use self.doc2sent.")
+                shard_claims[j] = self.doc2sent(shards[j])
+        return [claim for claims in shard_claims for claim in claims]
+
     def restore_claims(self, doc: str, claims: list, num_retries: int = 3, prompt: str = None) -> dict[str, dict]:
+        """Blocking version of `arestore_claims`."""
+        return run_sync(self.arestore_claims(doc=doc, claims=claims, num_retries=num_retries, prompt=prompt))
+
+    async def arestore_claims(self, doc: str, claims: list, num_retries: int = 3, prompt: str = None) -> dict[str, dict]:
         """Use GPT to map claims back to the document
 
         Args:
@@ -108,6 +191,15 @@ class Decompose:
 
             return claim2doc_detail, flag
 
+        if self.local_restore:
+            claim2doc_detail, confidence = align_claims(doc, claims)
+            if confidence and min(confidence.values()) >= self.restore_min_confidence:
+                return claim2doc_detail
+            logger.info(f"Low confidence of the local span alignment {min(confidence.values(), default=0):.2f}, ask the LLM.")
+
+        if claims and self._is_sharded(doc):
+            return await self._arestore_claims_sharded(doc, claims, num_retries=num_retries, prompt=prompt)
+
         if prompt is None:
             user_input = self.prompt.restore_prompt.format(doc=doc, claims=claims).strip()
         else:
@@ -117,13 +209,13 @@ class Decompose:
 
         tmp_restore = {}
         for i in range(num_retries):
-            response = self.llm_client.call(
+            response = await self.llm_client.acall(
                 messages=messages,
                 num_retries=1,
                 seed=42 + i,
             )
             try:
-                claim2doc = eval(response)
+                claim2doc = parse_llm_output(response, {str: str}, usage=self.llm_client.usage)
                 assert len(claim2doc) == len(claims)
                 claim2doc_detail, flag = restore(claim2doc)
                 if flag:
@@ -136,3 +228,28 @@ class Decompose:
                 logger.error(f"Parse LLM response error, prompt is: {messages}")
 
         return tmp_restore
+
+    async def _arestore_claims_sharded(self, doc: str, claims: list, num_retries: int = 3, prompt: str = None) -> dict:
+        """Restore the claims of a long document shard by shard, in parallel, assigning each claim to the shard
+        where its local alignment starts, and shift the spans back to document offsets."""
+        claim2doc_detail, _ = align_claims(doc, claims)
+        shards = self._shard_doc(doc)
+        shard_claims = [[] for _ in shards]
+        for claim in dict.fromkeys(claims):
+            start = claim2doc_detail[claim]["start"]
+            j = max(j for j, (st, _) in enumerate(shards) if st <= start)
+            shard_claims[j].append(claim)
+
+        shard_results = await asyncio.gather(
+            *[
+                self.arestore_claims(doc=doc[st:ed], claims=shard_claims[j], num_retries=num_retries, prompt=prompt)
+                for j, (st, ed) in enumerate(shards)
+                if shard_claims[j]
+            ]
+        )
+        offsets = [st for j, (st, _) in enumerate(shards) if shard_claims[j]]
+        restored = {}
+        for offset, result in zip(offsets, shard_results):
+            for claim, span in result.items():
+                restored[claim] = {"text": span["text"], "start": span["start"] + offset, "end": span["end"] + offset}
+        return restored
@@ -0,0 +1,99 @@
+import json
+import math
+import asyncio
+import threading
+
+from factcheck.utils.logger import CustomLogger
+
+logger = CustomLogger(__name__).getlog()
+
+
+class EvidenceGate:
+    def __init__(
+        self,
+        threshold: float = None,
+        top_k: int = None,
+        model=None,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 32,
+        audit_path: str = None,
+        scores_are_logits: bool = True,
+    ):
+        """Score (claim, evidence) pairs with a local cross-encoder on the CPU, and drop the pairs unlikely to be
+        relevant before they are verified by the LLM.
+
+        Scores are relevance probabilities in [0, 1]: the raw logits of the cross-encoder go through a sigmoid.
+
+        Args:
+            threshold (float, optional): drop the pairs with a relevance probability below this threshold, e.g. 0.5.
+                Defaults to None.
+            top_k (int, optional): keep at most the top k pairs of each claim. Defaults to None.
+            model (CrossEncoder, optional): an already loaded model, e.g. the `passage_ranker` of a retriever.
+                Defaults to None, i.e. load `model_name`.
+            model_name (str, optional): the cross-encoder to load. Defaults to "cross-encoder/ms-marco-MiniLM-L-6-v2".
+            batch_size (int, optional): the number of pairs scored per batch. Defaults to 32.
+            audit_path (str, optional): append the dropped pairs and their scores to this JSONL file. Defaults to None.
+            scores_are_logits (bool, optional): whether the model outputs logits, as the ms-marco cross-encoders do.
+                Set it to False for a model which already outputs probabilities. Defaults to True.
+        """
+        if model is None:
+            from sentence_transformers import CrossEncoder
+
+            model = CrossEncoder(model_name, max_length=512, device="cpu")
+        self.model = model
+        self.threshold = threshold
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.audit_path = audit_path
+        self.scores_are_logits = scores_are_logits
+        self._lock = threading.Lock()
+
+    def gate(self, claim_evidences_dict: dict[str, list[dict]]) -> tuple[dict, dict]:
+        """Split the evidences of each claim into the ones to verify and the dropped ones.
+
+        Args:
+            claim_evidences_dict (dict): a dictionary of claims and their corresponding evidences.
+
+        Returns:
+            tuple: the claims and their kept evidences, in their original order, and the claims and their
+                dropped (evidence, score) pairs.
+        """
+        pairs = [(claim, e) for claim, evidences in claim_evidences_dict.items() for e in evidences]
+        if not pairs or (self.threshold is None and self.top_k is None):
+            return claim_evidences_dict, {}
+        scores = self.model.predict([(claim, e["text"]) for claim, e in pairs], batch_size=self.batch_size)
+        if self.scores_are_logits:
+            scores = [1 / (1 + math.exp(-float(score))) for score in scores]
+
+        claim2scored = {claim: [] for claim in claim_evidences_dict}
+        for (claim, evidence), score in zip(pairs, scores):
+            claim2scored[claim].append((evidence, float(score)))
+
+        kept_dict, dropped_dict = {}, {}
+        for claim, scored in claim2scored.items():
+            keep = [i for i, (_, score) in enumerate(scored) if self.threshold is None or score >= self.threshold]
+            if self.top_k is not None:
+                keep = sorted(sorted(keep, key=lambda i: -scored[i][1])[: self.top_k])
+            kept_dict[claim] = [scored[i][0] for i in keep]
+            keep_set = set(keep)
+            dropped = [scored[i] for i in range(len(scored)) if i not in keep_set]
+            if dropped:
+                dropped_dict[claim] = dropped
+
+        num_dropped = sum(len(dropped) for dropped in dropped_dict.values())
+        logger.info(f"== Evidence gate dropped {num_dropped} of {len(pairs)} (claim, evidence) pairs.")
+        if self.audit_path is not None and dropped_dict:
+            self._audit(dropped_dict)
+        return kept_dict, dropped_dict
+
+    async def agate(self, claim_evidences_dict: dict[str, list[dict]]) -> tuple[dict, dict]:
+        """Async version of `gate`, run in a worker thread since scoring is CPU bound."""
+        return await asyncio.to_thread(self.gate, claim_evidences_dict)
+
+    def _audit(self, dropped_dict: dict) -> None:
+        with self._lock:
+            with open(self.audit_path, "a", encoding="utf-8") as f:
+                for claim, dropped in dropped_dict.items():
+                    for evidence, score in dropped:
+                        line = {"claim": claim, "text": evidence["text"], "url": evidence.get("url"), "score": score}
+                        f.write(json.dumps(line, ensure_ascii=False) + "\n")
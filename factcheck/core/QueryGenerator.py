@@ -1,21 +1,49 @@
+from typing import Union
 from factcheck.utils.logger import CustomLogger
+from factcheck.utils.async_util import run_sync
+from factcheck.utils.output_parser import parse_llm_output
+from factcheck.utils.batch import OfflineBatch
 
 logger = CustomLogger(__name__).getlog()
 
 
 class QueryGenerator:
-    def __init__(self, llm_client, prompt, max_query_per_claim: int = 5):
+    def __init__(
+        self,
+        llm_client,
+        prompt,
+        max_query_per_claim: int = 5,
+        offline_batch=None,
+        claims_per_prompt: Union[int, dict] = 1,
+    ):
         """Initialize the QueryGenerator class
 
         Args:
             llm_client (BaseClient): The LLM client used for generating questions.
             prompt (BasePrompt): The prompt used for generating questions.
+            offline_batch (OfflineBatch, optional): send the requests through a batch backend. Defaults to None.
+            claims_per_prompt (int | dict, optional): the number of claims per prompt with the batched prompt
+                `qgen_batch_prompt`, or a dict of numbers keyed by model name prefix, e.g. {"gpt-4o": 10}.
+                Defaults to 1, i.e. one prompt per claim.
         """
         self.llm_client = llm_client
         self.prompt = prompt
         self.max_query_per_claim = max_query_per_claim
+        self.offline_batch = offline_batch
+        self.claims_per_prompt = claims_per_prompt
+
+    def _get_claims_per_prompt(self) -> int:
+        if isinstance(self.claims_per_prompt, int):
+            return self.claims_per_prompt
+        # the longest matching model name prefix
+        matches = [name for name in self.claims_per_prompt if self.llm_client.model.startswith(name)]
+        return self.claims_per_prompt[max(matches, key=len)] if matches else 1
 
     def generate_query(self, claims: list[str], generating_time: int = 3, prompt: str = None) -> dict[str, list[str]]:
+        """Blocking version of `agenerate_query`."""
+        return run_sync(self.agenerate_query(claims=claims, generating_time=generating_time, prompt=prompt))
+
+    async def agenerate_query(self, claims: list[str], generating_time: int = 3, prompt: str = None) -> dict[str, list[str]]:
         """Generate questions for the given claims
 
         Args:
@@ -28,6 +56,13 @@ class QueryGenerator:
         generated_questions = [[]] * len(claims)
         attempts = 0
 
+        # batched prompts first, the claims missing from their responses are retried with one prompt per claim
+        claims_per_prompt = self._get_claims_per_prompt()
+        batch_prompt = getattr(self.prompt, "qgen_batch_prompt", None)
+        if prompt is None and batch_prompt is not None and claims_per_prompt > 1 and len(claims) > 1:
+            claim2questions = await self._agenerate_query_batched(claims, claims_per_prompt, batch_prompt)
+            generated_questions = [claim2questions.get(claim, []) for claim in claims]
+
         # construct messages
         messages_list = []
         for claim in claims:
@@ -42,11 +77,13 @@ class QueryGenerator:
             _indices = [_i for _i, _message in enumerate(messages_list) if generated_questions[_i] == []]
 
             _message_list = self.llm_client.construct_message_list(_messages)
-            _response_list = self.llm_client.multi_call(_message_list)
+            _response_list = await OfflineBatch.amulti_call_or_interactive(
+                self.offline_batch, self.llm_client, _message_list, seed=42 + attempts
+            )
 
             for _response, _index in zip(_response_list, _indices):
                 try:
-                    _questions = eval(_response)["Questions"]
+                    _questions = parse_llm_output(_response, {"Questions": [str]}, usage=self.llm_client.usage)["Questions"]
                     generated_questions[_index] = _questions
                 except:  # noqa: E722
                     logger.info(f"Warning: LLM response parse fail, retry {attempts}.")
@@ -58,3 +95,35 @@ class QueryGenerator:
             for _claim, _generated_questions in zip(claims, generated_questions)
         }
         return claim_query_dict
+
+    async def _agenerate_query_batched(self, claims: list[str], claims_per_prompt: int, batch_prompt: str) -> dict:
+        """Generate questions for groups of `claims_per_prompt` claims per prompt, the output is keyed by claim number.
+
+        Returns:
+            dict: the claims found in the responses and their questions.
+        """
+        unique_claims = list(dict.fromkeys(claims))
+        groups = [unique_claims[i : i + claims_per_prompt] for i in range(0, len(unique_claims), claims_per_prompt)]
+        user_inputs = [
+            batch_prompt.format(claims="\n".join([f"{i + 1}. {claim}" for i, claim in enumerate(group)])) for group in groups
+        ]
+        responses = await OfflineBatch.amulti_call_or_interactive(
+            self.offline_batch, self.llm_client, self.llm_client.construct_message_list(user_inputs), seed=42
+        )
+
+        claim2questions = {}
+        for group, response in zip(groups, responses):
+            try:
+                # a dict of any values, a malformed claim must not discard the other claims of the group
+                number2questions = parse_llm_output(response, dict, usage=self.llm_client.usage)
+            except ValueError as e:
+                logger.info(f"Warning: LLM response parse fail for a batch of {len(group)} claims: {e}")
+                continue
+            for i, claim in enumerate(group):
+                questions = number2questions.get(str(i + 1))
+                if isinstance(questions, list) and questions and all(isinstance(q, str) for q in questions):
+                    claim2questions[claim] = questions
+        missing = len(unique_claims) - len(claim2questions)
+        if missing:
+            logger.info(f"Warning: {missing} claims missing from the batched responses, generate them one by one.")
+        return claim2questions
@@ -1,4 +1,5 @@
 from concurrent.futures import ProcessPoolExecutor
+import asyncio
 import os
 from copy import deepcopy
 from factcheck.utils.web_util import parse_response, crawl_web
@@ -66,6 +67,10 @@ class BaseRetriever:
             claim_evidence_dict[claim] = evidences
         return claim_evidence_dict
 
+    async def aretrieve_evidence(self, claim_query_dict):
+        """Async version of `retrieve_evidence`, run in a worker thread since ranking is CPU bound."""
+        return await asyncio.to_thread(self.retrieve_evidence, claim_query_dict)
+
     def _retrieve_evidence4singleclaim(self, claim: str, query_list: list[str]):
         """Retrieve evidence for a single claim.
 
@@ -1,23 +1,67 @@
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import json
 import requests
-import os
 import re
+import unicodedata
 import bs4
 from factcheck.utils.logger import CustomLogger
-from factcheck.utils.web_util import crawl_web
+from factcheck.utils.async_util import run_sync
+from factcheck.utils.web_util import acrawl_web, get_async_http_client
+from factcheck.utils.cassette import intercept, RecordedResponse
+from factcheck.utils.near_dup import cluster_near_duplicates
+from factcheck.utils.cache import get_disk_cache
 
 logger = CustomLogger(__name__).getlog()
 
 
+# separators stripped around the words of a query, symbols inside or after a word ("C++", "C#", "AT&T") are kept
+_QUERY_PUNCTUATION = ".,;:!?¿¡\"'`()[]{}«»“”‘’…"
+
+
+def _normalize_query(query: str) -> str:
+    """Normalise the Unicode form and case of a query, strip the punctuation around its words and collapse its
+    spaces. Meaning-bearing symbols are kept, so that "C++ release year" and "C release year" stay different."""
+    words = (word.strip(_QUERY_PUNCTUATION) for word in unicodedata.normalize("NFKC", query).casefold().split())
+    return " ".join(word for word in words if word)
+
+
 class SerperEvidenceRetriever:
-    def __init__(self, llm_client, api_config: dict = None):
-        """Initialize the SerperEvidenceRetrieve class"""
+    def __init__(self, llm_client, api_config: dict = None, query_max_distance: int = None, query_min_jaccard: float = 0.8):
+        """Initialize the SerperEvidenceRetrieve class
+
+        Args:
+            llm_client (BaseClient): The LLM client of the evidence retrieval step.
+            api_config (dict, optional): The API keys. Defaults to None.
+            query_max_distance (int, optional): also merge near-duplicate queries, whose SimHash fingerprints over
+                their words differ by at most this number of bits. Defaults to None, i.e. only identical queries
+                once normalised are merged.
+            query_min_jaccard (float, optional): near-duplicate queries must also share at least this fraction of
+                their words (Jaccard similarity), and the same numbers. Defaults to 0.8.
+        """
         self.lang = "en"
         self.serper_key = api_config["SERPER_API_KEY"]
         self.llm_client = llm_client
+        self.query_max_distance = query_max_distance
+        self.query_min_jaccard = query_min_jaccard
+
+        # opt-in persistent cache of the search results of normalised queries
+        self.cache = None
+        if api_config.get("SERPER_CACHE_PATH"):
+            self.cache = get_disk_cache(
+                api_config["SERPER_CACHE_PATH"],
+                ttl=float(api_config.get("SERPER_CACHE_TTL") or 24 * 3600),
+                max_size_mb=float(api_config.get("SERPER_CACHE_MAX_SIZE_MB") or 512),
+            )
 
     def retrieve_evidence(self, claim_queries_dict, top_k: int = 3, snippet_extend_flag: bool = True):
+        """Blocking version of `aretrieve_evidence`."""
+        return run_sync(
+            self.aretrieve_evidence(
+                claim_queries_dict=claim_queries_dict, top_k=top_k, snippet_extend_flag=snippet_extend_flag
+            )
+        )
+
+    async def aretrieve_evidence(self, claim_queries_dict, top_k: int = 3, snippet_extend_flag: bool = True):
         """Retrieve evidences for the given claims
 
         Args:
@@ -29,22 +73,58 @@ class SerperEvidenceRetriever:
             dict: a dictionary of claims and their corresponding evidences.
         """
         logger.info("Collecting evidences ...")
-        query_list = [y for x in claim_queries_dict.items() for y in x[1]]
-        evidence_list = self._retrieve_evidence_4_all_claim(
+        canonical, query2claims = self._merge_queries(claim_queries_dict)
+        query_list = list(query2claims.keys())
+        evidence_list = await self._retrieve_evidence_4_all_claim(
             query_list=query_list, top_k=top_k, snippet_extend_flag=snippet_extend_flag
         )
+        query2evidences = dict(zip(query_list, evidence_list))
 
-        i = 0
+        # fan the evidences of each searched query out to the claims which asked it, in the order of their queries
         claim_evidence_dict = {}
         for claim, queries in claim_queries_dict.items():
-            evidences_per_query_L = evidence_list[i : i + len(queries)]
-            claim_evidence_dict[claim] = [e for evidences in evidences_per_query_L for e in evidences]
-            i += len(queries)
-        assert i == len(evidence_list)
+            searched = list(dict.fromkeys(canonical[query] for query in queries))
+            claim_evidence_dict[claim] = [e for query in searched for e in query2evidences[query]]
         logger.info("Collect evidences done!")
         return claim_evidence_dict
 
-    def _retrieve_evidence_4_all_claim(
+    def _merge_queries(self, claim_queries_dict: dict[str, list[str]]) -> tuple[dict, dict]:
+        """Merge the queries of all claims which are identical once normalised (see `_normalize_query`),
+        or near-duplicates if `query_max_distance` is set, so that each is searched once.
+
+        Returns:
+            tuple: the query searched for each query, and the claims asking each searched query.
+        """
+        canonical, query2claims, normalized = {}, {}, {}
+        for claim, queries in claim_queries_dict.items():
+            for query in queries:
+                key = _normalize_query(query)
+                if key not in normalized:
+                    normalized[key] = query
+                canonical[query] = normalized[key]
+
+        if self.query_max_distance is not None:
+            keys = list(normalized.keys())
+            # the fingerprints only find candidates, a different year or word is confirmed on the word sets
+            representatives = cluster_near_duplicates(
+                keys, max_distance=self.query_max_distance, shingle_size=1, min_jaccard=self.query_min_jaccard
+            )
+            merged = {normalized[key]: normalized[keys[i]] for key, i in zip(keys, representatives)}
+            canonical = {query: merged[searched] for query, searched in canonical.items()}
+
+        for claim, queries in claim_queries_dict.items():
+            for query in queries:
+                claims = query2claims.setdefault(canonical[query], [])
+                if claim not in claims:
+                    claims.append(claim)
+
+        num_queries = sum(len(queries) for queries in claim_queries_dict.values())
+        if num_queries > len(query2claims):
+            self.llm_client.usage.calls_saved += num_queries - len(query2claims)
+            logger.info(f"== Merged {num_queries} queries into {len(query2claims)} searches.")
+        return canonical, query2claims
+
+    async def _retrieve_evidence_4_all_claim(
         self, query_list: list[str], top_k: int = 3, snippet_extend_flag: bool = True
     ) -> list[list[str]]:
         """Retrieve evidences for the given queries
@@ -55,29 +135,24 @@ class SerperEvidenceRetriever:
             snippet_extend_flag (bool, optional): whether to extend the snippet. Defaults to True.
 
         Returns:
-            list[list[]]: a list of [a list of evidences for each given query].
+            list[list[]]: a list of [a list of evidences for each given query]. Each evidence has a text, an url
+                and a retrieval score, the reciprocal rank of its search result.
         """
 
         # init the evidence list with None
         evidences = [[] for _ in query_list]
 
-        # get the response from serper
-        serper_responses = []
-        for i in range(0, len(query_list), 100):
-            batch_query_list = query_list[i : i + 100]
-            batch_response = self._request_serper_api(batch_query_list)
-            if batch_response is None:
-                logger.error("Serper API request error!")
-                return evidences
-            else:
-                serper_responses += batch_response.json()
+        # get the response from the cache or serper
+        serper_responses = await self._asearch(query_list)
+        if serper_responses is None:
+            return evidences
 
         # get the responses for queries with an answer box
         query_url_dict = {}
         url_to_date = {}  # TODO: decide whether to use date
         _snippet_to_check = []
         for i, (query, response) in enumerate(zip(query_list, serper_responses)):
-            if query != response.get("searchParameters").get("q"):
+            if _normalize_query(query) != _normalize_query(response.get("searchParameters").get("q")):
                 logger.error("Serper change query from {} TO {}".format(query, response.get("searchParameters").get("q")))
 
             # TODO: provide the link for the answer box
@@ -87,6 +162,7 @@ class SerperEvidenceRetriever:
                         {
                             "text": f"{query}\nAnswer: {response['answerBox']['answer']}",
                             "url": "Google Answer Box",
+                            "score": 1.0,
                         }
                     ]
                 else:
@@ -94,6 +170,7 @@ class SerperEvidenceRetriever:
                         {
                             "text": f"{query}\nAnswer: {response['answerBox']['snippet']}",
                             "url": "Google Answer Box",
+                            "score": 1.0,
                         }
                     ]
             # TODO: currently --- if there is google answer box, we only got 1 evidence, otherwise, we got multiple, this will deminish the value of the google answer.
@@ -102,7 +179,8 @@ class SerperEvidenceRetriever:
 
                 if (len(_snippet_to_check) == 0) or (not snippet_extend_flag):
                     evidences[i] += [
-                        {"text": re.sub(r"\n+", "\n", _result["snippet"]), "url": _result["link"]} for _result in topk_results
+                        {"text": re.sub(r"\n+", "\n", _result["snippet"]), "url": _result["link"], "score": 1 / (rank + 1)}
+                        for rank, _result in enumerate(topk_results)
                     ]
 
                 # Save date for each url
@@ -116,7 +194,7 @@ class SerperEvidenceRetriever:
             return evidences
 
         # crawl web for queries without answer box
-        responses = crawl_web(query_url_dict)
+        responses = await acrawl_web(query_url_dict)
         # Get extended snippets based on the snippet from serper
         flag_to_check = [_item[0] for _item in responses]
         response_to_check = [_item[1] for _item in responses]
@@ -150,16 +228,14 @@ class SerperEvidenceRetriever:
             else:
                 return snippet
 
-        # Question: if os.cpu_count() cause problems when running in parallel?
-        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-            _extended_snippet = list(
-                executor.map(
-                    lambda _r, _s, _f: bs4_parse_text(_r, _s, _f),
-                    response_to_check,
-                    _snippet_to_check,
-                    flag_to_check,
-                )
-            )
+        # parse the web pages in worker threads to keep the event loop responsive
+        loop = asyncio.get_running_loop()
+        _extended_snippet = await asyncio.gather(
+            *[
+                loop.run_in_executor(None, bs4_parse_text, _r, _s, _f)
+                for _r, _s, _f in zip(response_to_check, _snippet_to_check, flag_to_check)
+            ]
+        )
 
         # merge the snippets by query
         query_snippet_url_dict = {}
@@ -173,11 +249,45 @@ class SerperEvidenceRetriever:
             _query_index = query_list.index(_query)
             _snippet_url_list = query_snippet_url_dict[_query]
             evidences[_query_index] += [
-                {"text": re.sub(r"\n+", "\n", snippet), "url": _url} for snippet, _url in _snippet_url_list
+                {"text": re.sub(r"\n+", "\n", snippet), "url": _url, "score": 1 / (query_url_dict[_query].index(_url) + 1)}
+                for snippet, _url in _snippet_url_list
             ]
 
         return evidences
 
+    async def _asearch(self, query_list: list[str]) -> list[dict]:
+        """Get the Serper response of each query, from the cache if enabled, and only send the misses to Serper
+        in batches of 100 queries.
+
+        Returns:
+            list[dict]: the response of each query, None if a Serper request failed.
+        """
+        keys = [_normalize_query(query) for query in query_list]
+        cached = {}
+        if self.cache is not None:
+            cached = self.cache.get_many(list(dict.fromkeys(keys)))
+            self.llm_client.usage.cache_hits += sum(key in cached for key in keys)
+            self.llm_client.usage.cache_misses += sum(key not in cached for key in keys)
+
+        misses = list({key: query for key, query in zip(keys, query_list) if key not in cached}.items())
+        batch_responses = await asyncio.gather(
+            *[self._arequest_serper_api([query for _, query in misses[i : i + 100]]) for i in range(0, len(misses), 100)]
+        )
+        fetched = {}
+        for i, batch_response in zip(range(0, len(misses), 100), batch_responses):
+            if batch_response is None:
+                logger.error("Serper API request error!")
+                return None
+            for (key, _), response in zip(misses[i : i + 100], batch_response.json()):
+                # keep the parts of the response used to build evidences
+                fetched[key] = {k: response[k] for k in ("searchParameters", "answerBox", "organic") if k in response}
+
+        if self.cache is not None and fetched:
+            self.cache.set_many(fetched)
+            logger.info(f"== Serper cache: {len(query_list) - len(misses)} hits, {len(misses)} queries searched.")
+        cached.update(fetched)
+        return [cached[key] for key in keys]
+
     def _request_serper_api(self, questions):
         """Request the serper api
 
@@ -187,6 +297,31 @@ class SerperEvidenceRetriever:
         Returns:
             web response: the response from the serper api
         """
+        url, headers, payload = self._serper_request_args(questions)
+        response = None
+        response = requests.request("POST", url, headers=headers, data=payload)
+        return self._check_serper_response(response)
+
+    async def _arequest_serper_api(self, questions):
+        """Request the serper api with the shared async http client
+
+        Args:
+            questions (list): a list of questions to request the serper api.
+
+        Returns:
+            web response: the response from the serper api
+        """
+        url, headers, payload = self._serper_request_args(questions)
+        response = await intercept(
+            "serper",
+            payload,
+            lambda: get_async_http_client().post(url, headers=headers, content=payload, timeout=None),
+            dump=RecordedResponse.dump,
+            load=lambda recorded: RecordedResponse(**recorded),
+        )
+        return self._check_serper_response(response)
+
+    def _serper_request_args(self, questions):
         url = "https://google.serper.dev/search"
 
         headers = {
@@ -196,9 +331,9 @@ class SerperEvidenceRetriever:
 
         questions_data = [{"q": question, "autocorrect": False} for question in questions]
         payload = json.dumps(questions_data)
-        response = None
-        response = requests.request("POST", url, headers=headers, data=payload)
+        return url, headers, payload
 
+    def _check_serper_response(self, response):
         if response.status_code == 200:
             return response
         elif response.status_code == 403:
@@ -3,3 +3,4 @@ from .CheckWorthy import Checkworthy
 from .QueryGenerator import QueryGenerator
 from .Retriever import retriever_mapper
 from .ClaimVerify import ClaimVerify
+from .EvidenceGate import EvidenceGate
@@ -7,6 +7,18 @@ keys = [
     "ANTHROPIC_API_KEY",
     "LOCAL_API_KEY",
     "LOCAL_API_URL",
+    "LLM_CACHE_PATH",
+    "LLM_CACHE_TTL",
+    "LLM_CACHE_MAX_SIZE_MB",
+    "LLM_MAX_CONNECTIONS",
+    "LLM_MAX_KEEPALIVE_CONNECTIONS",
+    "LLM_KEEPALIVE_EXPIRY",
+    "LLM_TIMEOUT",
+    "LLM_HEDGE_PERCENTILE",
+    "LLM_HEDGE_BUDGET",
+    "SERPER_CACHE_PATH",
+    "SERPER_CACHE_TTL",
+    "SERPER_CACHE_MAX_SIZE_MB",
 ]
 
 
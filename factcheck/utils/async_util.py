@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get the event loop used by the blocking API, start it in a daemon thread on first use."""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="factcheck-event-loop", daemon=True)
+            _loop_thread.start()
+    return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine to completion from blocking code and return its result.
+
+    All blocking calls share one long-lived background event loop, so that async clients (and their
+    connection pools) bound to that loop are reused across calls, and blocking wrappers can be used from
+    threads which already run an event loop of their own.
+
+    Args:
+        coro (coroutine): the coroutine to run.
+
+    Returns:
+        any: the result of the coroutine.
+    """
+    loop = _get_background_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("Blocking FactCheck API called from its own event loop, await the async version instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+async def _anext(async_iterator):
+    return await async_iterator.__anext__()
+
+
+async def _aclose(async_iterator):
+    await async_iterator.aclose()
+
+
+def iter_sync(async_iterator):
+    """Iterate an async iterator from blocking code, see `run_sync`.
+
+    Args:
+        async_iterator (AsyncIterator): the async iterator to consume, e.g. an async generator.
+
+    Yields:
+        any: the items of the async iterator.
+    """
+    try:
+        while True:
+            try:
+                yield run_sync(_anext(async_iterator))
+            except StopAsyncIteration:
+                return
+    finally:
+        if hasattr(async_iterator, "aclose"):
+            run_sync(_aclose(async_iterator))
@@ -0,0 +1,263 @@
+import os
+import json
+import asyncio
+import hashlib
+import threading
+
+from factcheck.utils.logger import CustomLogger
+
+logger = CustomLogger(__name__).getlog()
+
+# terminal states of a provider batch which did not produce results
+_FAILED_STATUSES = ("failed", "expired", "cancelled")
+
+
+class BatchPending(Exception):
+    def __init__(self, batch_id: str):
+        """Raised by `OfflineBatch` in non-waiting mode when the results of a batch are not ready yet.
+        Re-running the same documents later resumes from the persisted state."""
+        super().__init__(f"Batch {batch_id} is still pending, re-run later to resume.")
+        self.batch_id = batch_id
+
+
+class BatchBackend:
+    """Submit JSONL batch files of chat completion requests, in the OpenAI batch format, and fetch their results."""
+
+    async def submit(self, input_path: str) -> str:
+        """Submit a batch file.
+
+        Args:
+            input_path (str): path of the JSONL file, one request with a `custom_id` per line.
+
+        Returns:
+            str: the id of the batch.
+        """
+        raise NotImplementedError
+
+    async def retrieve(self, batch_id: str, output_path: str) -> bool:
+        """Fetch the results of a batch if it is completed.
+
+        Args:
+            batch_id (str): the id of the batch.
+            output_path (str): where to write the JSONL results, one response with a `custom_id` per line.
+
+        Returns:
+            bool: whether the results were written, False if the batch is still pending.
+        """
+        raise NotImplementedError
+
+
+class LocalBatchBackend(BatchBackend):
+    def __init__(self, work_dir: str, llm_client=None):
+        """A file-based stand-in for a provider batch service.
+
+        Submitted batches are copied to `work_dir`. If `llm_client` is given, a batch is processed with
+        interactive `multi_call` requests when its results are first retrieved; otherwise the results are
+        expected to be dropped at `<work_dir>/<batch_id>.output.jsonl` by another process.
+
+        Args:
+            work_dir (str): the directory of the batch files.
+            llm_client (BaseClient, optional): the client processing the batches. Defaults to None.
+        """
+        os.makedirs(work_dir, exist_ok=True)
+        self.work_dir = work_dir
+        self.llm_client = llm_client
+
+    async def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            content = f.read()
+        batch_id = "local-" + hashlib.sha256(content).hexdigest()[:16]
+        with open(os.path.join(self.work_dir, f"{batch_id}.input.jsonl"), "wb") as f:
+            f.write(content)
+        return batch_id
+
+    async def retrieve(self, batch_id: str, output_path: str) -> bool:
+        result_path = os.path.join(self.work_dir, f"{batch_id}.output.jsonl")
+        if not os.path.exists(result_path):
+            if self.llm_client is None:
+                return False
+            await self._process(batch_id, result_path)
+        with open(result_path, "rb") as src, open(output_path, "wb") as dst:
+            dst.write(src.read())
+        return True
+
+    async def _process(self, batch_id: str, result_path: str) -> None:
+        with open(os.path.join(self.work_dir, f"{batch_id}.input.jsonl"), encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        responses = await asyncio.gather(
+            *[self.llm_client.amulti_call([r["body"]["messages"]], seed=r["body"].get("seed", 42)) for r in requests],
+            return_exceptions=True,
+        )
+        with open(result_path, "w", encoding="utf-8") as f:
+            for request, response in zip(requests, responses):
+                if isinstance(response, Exception):
+                    line = {"custom_id": request["custom_id"], "response": None, "error": {"message": str(response)}}
+                else:
+                    body = {"choices": [{"message": {"role": "assistant", "content": response[0]}}]}
+                    line = {"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+class OpenAIBatchBackend(BatchBackend):
+    def __init__(self, llm_client, completion_window: str = "24h"):
+        """Submit batches to the OpenAI Batch API (or a compatible API) with the API client of an LLM client.
+
+        Args:
+            llm_client (BaseClient): a client with an OpenAI `async_client`, e.g. `GPTClient`.
+            completion_window (str, optional): the completion window of the batches. Defaults to "24h".
+        """
+        self.llm_client = llm_client
+        self.completion_window = completion_window
+
+    async def submit(self, input_path: str) -> str:
+        client = self.llm_client.async_client
+        with open(input_path, "rb") as f:
+            input_file = await client.files.create(file=f, purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window=self.completion_window
+        )
+        return batch.id
+
+    async def retrieve(self, batch_id: str, output_path: str) -> bool:
+        client = self.llm_client.async_client
+        batch = await client.batches.retrieve(batch_id)
+        if batch.status in _FAILED_STATUSES:
+            raise RuntimeError(f"Batch {batch_id} {batch.status}.")
+        if batch.status != "completed":
+            return False
+        content = b""
+        for file_id in [batch.output_file_id, batch.error_file_id]:
+            if file_id:
+                content += (await client.files.content(file_id)).read()
+        with open(output_path, "wb") as f:
+            f.write(content)
+        return True
+
+
+class OfflineBatch:
+    def __init__(self, backend: BatchBackend, work_dir: str, poll_interval: float = 60, wait: bool = True):
+        """Run LLM requests through a batch backend instead of interactive `multi_call` requests.
+
+        Requests are written to a JSONL batch file and submitted once; the submitted batches are recorded in
+        `<work_dir>/batches.json`, so identical requests resume polling the same batch after a restart. The
+        pipeline state of each document is persisted under `<work_dir>/state/` between stages.
+
+        Args:
+            backend (BatchBackend): the batch service, e.g. `OpenAIBatchBackend` or `LocalBatchBackend`.
+            work_dir (str): the directory of the batch files and persisted state.
+            poll_interval (float, optional): seconds between polls of a pending batch. Defaults to 60.
+            wait (bool, optional): whether to wait for the results, otherwise raise `BatchPending`. Defaults to True.
+        """
+        os.makedirs(os.path.join(work_dir, "state"), exist_ok=True)
+        self.backend = backend
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        self.wait = wait
+        self._lock = threading.RLock()
+
+    async def amulti_call(self, llm_client, messages_list: list, seed: int = 42) -> list[str]:
+        """Drop-in replacement of `llm_client.amulti_call`, returns "" for the requests which failed in the batch."""
+        if not messages_list:
+            return []
+        requests = [
+            {"custom_id": str(i), "method": "POST", "url": "/v1/chat/completions", "body": llm_client.batch_request(m, seed)}
+            for i, m in enumerate(messages_list)
+        ]
+        key = hashlib.sha256(json.dumps(requests, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:24]
+        output_path = os.path.join(self.work_dir, f"{key}.output.jsonl")
+
+        batch_id = self._get_batches().get(key)
+        if batch_id is None:
+            input_path = os.path.join(self.work_dir, f"{key}.input.jsonl")
+            with open(input_path, "w", encoding="utf-8") as f:
+                for request in requests:
+                    f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            batch_id = await self.backend.submit(input_path)
+            self._set_batch(key, batch_id)
+            logger.info(f"== Submitted batch {batch_id} of {len(requests)} requests.")
+
+        while not os.path.exists(output_path):
+            if await self.backend.retrieve(batch_id, output_path):
+                break
+            if not self.wait:
+                raise BatchPending(batch_id)
+            logger.info(f"== Batch {batch_id} pending, polling again in {self.poll_interval}s.")
+            await asyncio.sleep(self.poll_interval)
+
+        return self._parse_output(llm_client, output_path, len(requests))
+
+    @staticmethod
+    async def amulti_call_or_interactive(offline_batch, llm_client, messages_list: list, seed: int = 42) -> list[str]:
+        """Send the requests through `offline_batch`, or as interactive `multi_call` requests if it is None.
+
+        Args:
+            offline_batch (OfflineBatch): the offline batch of the pipeline step, None in interactive mode.
+            llm_client (BaseClient): the LLM client of the pipeline step.
+            messages_list (list): the messages of each request.
+            seed (int, optional): the seed of the requests. Defaults to 42.
+
+        Returns:
+            list[str]: the response of each request.
+        """
+        if offline_batch is not None:
+            return await offline_batch.amulti_call(llm_client, messages_list, seed=seed)
+        return await llm_client.amulti_call(messages_list, seed=seed)
+
+    def _parse_output(self, llm_client, output_path: str, num_requests: int) -> list[str]:
+        responses = [""] * num_requests
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                try:
+                    body = result["response"]["body"]
+                    responses[int(result["custom_id"])] = body["choices"][0]["message"]["content"]
+                except (KeyError, IndexError, TypeError, ValueError):
+                    logger.info(f"Warning: batch request {result.get('custom_id')} failed: {result.get('error')}")
+                    continue
+                usage = body.get("usage") or {}
+                llm_client.usage.prompt_tokens += usage.get("prompt_tokens", 0)
+                llm_client.usage.completion_tokens += usage.get("completion_tokens", 0)
+        return responses
+
+    def _get_batches(self) -> dict:
+        path = os.path.join(self.work_dir, "batches.json")
+        with self._lock:
+            if not os.path.exists(path):
+                return {}
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+
+    def _set_batch(self, key: str, batch_id: str) -> None:
+        with self._lock:
+            batches = self._get_batches()
+            batches[key] = batch_id
+            self._write_json(os.path.join(self.work_dir, "batches.json"), batches)
+
+    def load_state(self, doc: str) -> dict:
+        """Load the persisted pipeline state of a document, empty if it has not been started."""
+        path = self._state_path(doc)
+        with self._lock:
+            if not os.path.exists(path):
+                return {}
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+
+    def save_state(self, doc: str, state: dict) -> None:
+        self._write_json(self._state_path(doc), state)
+
+    def clear_state(self, doc: str) -> None:
+        with self._lock:
+            if os.path.exists(self._state_path(doc)):
+                os.remove(self._state_path(doc))
+
+    def _state_path(self, doc: str) -> str:
+        return os.path.join(self.work_dir, "state", hashlib.sha256(doc.encode("utf-8")).hexdigest()[:24] + ".json")
+
+    def _write_json(self, path: str, obj) -> None:
+        # write to a temporary file first, so that an interrupted run never leaves a corrupted file
+        with self._lock:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(obj, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# sqlite limits the number of host parameters in one statement
+_SQL_CHUNK_SIZE = 500
+
+_disk_caches = {}
+_disk_caches_lock = threading.Lock()
+
+
+class DiskCache:
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600, max_size_mb: float = 512):
+        """A persistent key-value store backed by sqlite, with per-entry TTL and size-bounded LRU eviction.
+
+        Args:
+            path (str): path of the sqlite file, created if it does not exist.
+            ttl (float, optional): default time to live of an entry in seconds. Defaults to 7 days.
+            max_size_mb (float, optional): maximum total size of the stored values in MB, the least recently
+                used entries are evicted beyond it. Defaults to 512.
+        """
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_size = int(max_size_mb * 1024 * 1024)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, expire_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_expire_at ON cache (expire_at)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def get(self, key: str, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: list[str]) -> dict:
+        """Look up several keys at once, expired entries are treated as missing.
+
+        Args:
+            keys (list[str]): the keys to look up.
+
+        Returns:
+            dict: the found keys and their values.
+        """
+        now = time.time()
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _SQL_CHUNK_SIZE):
+                chunk = keys[i : i + _SQL_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE expire_at > ? AND key IN ({placeholders})", [now, *chunk]
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    placeholders = ",".join("?" * len(rows))
+                    self._conn.execute(
+                        f"UPDATE cache SET last_access = ? WHERE key IN ({placeholders})", [now, *[row[0] for row in rows]]
+                    )
+        return {key: json.loads(value) for key, value in found.items()}
+
+    def set(self, key: str, value, ttl: float = None) -> None:
+        self.set_many({key: value}, ttl=ttl)
+
+    def set_many(self, items: dict, ttl: float = None) -> None:
+        """Store several JSON serialisable values at once, then evict expired and least recently used entries.
+
+        Args:
+            items (dict): the keys and values to store.
+            ttl (float, optional): time to live of the entries in seconds. Defaults to the cache TTL.
+        """
+        now = time.time()
+        expire_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for key, value in items.items():
+                value = json.dumps(value, ensure_ascii=False)
+                old = self._conn.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+                self._size -= old[0] if old else 0
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, size, expire_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), expire_at, now),
+                )
+                self._size += len(value)
+            self._evict(now)
+            self._conn.execute("COMMIT")
+
+    def _evict(self, now: float) -> None:
+        query = "SELECT COALESCE(SUM(size), 0) FROM cache WHERE expire_at <= ?"
+        expired_size = self._conn.execute(query, (now,)).fetchone()[0]
+        if expired_size:
+            self._conn.execute("DELETE FROM cache WHERE expire_at <= ?", (now,))
+            self._size -= expired_size
+        while self._size > self.max_size:
+            rows = self._conn.execute("SELECT key, size FROM cache ORDER BY last_access LIMIT 100").fetchall()
+            if not rows:
+                self._size = 0
+                break
+            self._conn.executemany("DELETE FROM cache WHERE key = ?", [(row[0],) for row in rows])
+            self._size -= sum(row[1] for row in rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+def get_disk_cache(path: str, ttl: float = 7 * 24 * 3600, max_size_mb: float = 512) -> DiskCache:
+    """Get the DiskCache of a path, shared by all users of the same file in this process."""
+    path = os.path.abspath(path)
+    with _disk_caches_lock:
+        if path not in _disk_caches:
+            _disk_caches[path] = DiskCache(path, ttl=ttl, max_size_mb=max_size_mb)
+        return _disk_caches[path]
@@ -0,0 +1,123 @@
+import os
+import gzip
+import json
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+
+_cassette = None
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode for a request which was not recorded."""
+
+
+class RecordedResponse:
+    def __init__(self, status_code: int, text: str, url: str = ""):
+        """A recorded HTTP response, exposing the attributes of `httpx.Response` used by the pipeline."""
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+
+    def json(self):
+        return json.loads(self.text)
+
+    @staticmethod
+    def dump(response) -> dict:
+        return {"status_code": response.status_code, "text": response.text, "url": str(response.url)}
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "replay", replay_latency: bool = False):
+        """Record the external I/O of fact-check runs (LLM calls, Serper batches and crawled pages) to a file,
+        or serve it back without network access.
+
+        Interactions are keyed by their request, e.g. the model, messages and seed of an LLM call. Identical
+        requests are replayed in the order they were recorded, the last recorded response being reused.
+
+        Args:
+            path (str): path of the cassette, a gzipped JSON file.
+            mode (str, optional): "record" or "replay". Defaults to "replay".
+            replay_latency (bool, optional): whether to wait for the recorded latency of each interaction on
+                replay. Defaults to False.
+        """
+        assert mode in ["record", "replay"], "mode must be either 'record' or 'replay'."
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.interactions = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        if mode == "replay":
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                self.interactions = json.load(f)
+
+    async def intercept(self, kind: str, key: str, call, dump=None, load=None):
+        """Record the result of a request, or replay it.
+
+        Args:
+            kind (str): the kind of request, e.g. "llm", "serper" or "web".
+            key (str): identifies the request.
+            call (Callable): returns the coroutine sending the request, only used in record mode.
+            dump (Callable, optional): converts the result to a JSON serialisable value. Defaults to None.
+            load (Callable, optional): converts a recorded value back to a result. Defaults to None.
+
+        Returns:
+            any: the result of the request.
+        """
+        if self.mode == "record":
+            st_time = time.monotonic()
+            result = await call()
+            latency = time.monotonic() - st_time
+            with self._lock:
+                entries = self.interactions.setdefault(kind, {}).setdefault(key, [])
+                entries.append({"response": dump(result) if dump else result, "latency": round(latency, 4)})
+            return result
+
+        with self._lock:
+            entries = self.interactions.get(kind, {}).get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded {kind} request for {key[:100]!r} in {self.path}.")
+            cursor = self._cursors.get((kind, key), 0)
+            self._cursors[(kind, key)] = cursor + 1
+            entry = entries[min(cursor, len(entries) - 1)]
+        if self.replay_latency:
+            await asyncio.sleep(entry["latency"])
+        return load(entry["response"]) if load else entry["response"]
+
+    def save(self) -> None:
+        """Write the recorded interactions to the cassette file."""
+        dirname = os.path.dirname(self.path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        with self._lock:
+            with gzip.open(self.path, "wt", encoding="utf-8") as f:
+                json.dump(self.interactions, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def get_cassette():
+    """Get the active cassette, None if external I/O is neither recorded nor replayed."""
+    return _cassette
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = "replay", replay_latency: bool = False):
+    """Record or replay all external I/O of the fact-check runs within the context, see `Cassette`.
+    In record mode, the cassette is saved when the context exits."""
+    global _cassette
+    cassette = Cassette(path, mode=mode, replay_latency=replay_latency)
+    _cassette = cassette
+    try:
+        yield cassette
+    finally:
+        _cassette = None
+        if mode == "record":
+            cassette.save()
+
+
+async def intercept(kind: str, key: str, call, dump=None, load=None):
+    """Send a request through the active cassette, see `Cassette.intercept`, or directly if there is none."""
+    if _cassette is None:
+        return await call()
+    return await _cassette.intercept(kind, key, call, dump=dump, load=load)
@@ -0,0 +1,110 @@
+import re
+
+_WORD = re.compile(r"[^\W\d_]+")
+# numbers count as words when deciding whether a claim is a fragment
+_TOKEN = re.compile(r"[^\W_]+")
+_DIGIT = re.compile(r"\d")
+# the whole claim is a greeting, optionally addressed to someone ("Thanks a lot, John!")
+_GREETING = re.compile(
+    r"^\s*(hi|hello|hey|dear|greetings|thanks|thank you|good (morning|afternoon|evening|night)|best regards|"
+    r"kind regards|regards|cheers|bye|goodbye|welcome)\b(\s+(so much|a lot|very much|all|everyone|again|back))?"
+    r"[\s,]*([^\W\d_]+\s*){0,2}[.!]*\s*$",
+    re.IGNORECASE,
+)
+_OPINION = re.compile(
+    r"\b(i|we)\s+(personally\s+)?(think|believe|feel|guess|suppose|hope|wish|love|like|hate|prefer|doubt)\b|"
+    r"\bin (my|our) (opinion|view)\b|\bi'm sure\b",
+    re.IGNORECASE,
+)
+# pronouns without a clear referent make a claim unverifiable on its own
+_UNRESOLVED = {"he", "she", "it", "they", "him", "her", "them", "his", "its", "their", "this", "that", "these", "those"}
+# capitalised only because they start the sentence
+_SENTENCE_STARTERS = {"the", "a", "an", "in", "on", "at", "by", "for", "since", "during", "after", "before", "there", "i"}
+
+
+class CheckworthyFilter:
+    """Decide the checkworthiness of clear-cut claims locally, on the CPU, before asking the LLM."""
+
+    def classify(self, claims: list[str]) -> list[tuple]:
+        """Classify claims.
+
+        Args:
+            claims (list[str]): the claims.
+
+        Returns:
+            list[tuple]: for each claim, whether it is checkworthy, the confidence of the decision in [0, 1],
+                and its reason. The decision is None if the filter has no opinion.
+        """
+        raise NotImplementedError
+
+
+class RuleCheckworthyFilter(CheckworthyFilter):
+    def __init__(self, min_words: int = 3):
+        """Rules for claims which are obviously not checkworthy (greetings, questions, first person opinions,
+        fragments), or obviously checkworthy (figures about a named entity, without unresolved pronouns).
+
+        Args:
+            min_words (int, optional): claims with fewer words are fragments. Defaults to 3.
+        """
+        self.min_words = min_words
+
+    def classify(self, claims: list[str]) -> list[tuple]:
+        return [self._classify(claim) for claim in claims]
+
+    def _classify(self, claim: str) -> tuple:
+        words = _WORD.findall(claim)
+        has_entity = any(
+            w[0].isupper() and w.lower() not in _UNRESOLVED and (i > 0 or w.lower() not in _SENTENCE_STARTERS)
+            for i, w in enumerate(words)
+            if w != "I"
+        )
+        if _GREETING.search(claim):
+            return False, 0.95, "a greeting or courtesy phrase"
+        # short claims with a figure or a named entity ("Einstein died 1955.") are left to the LLM
+        if len(_TOKEN.findall(claim)) < self.min_words and not _DIGIT.search(claim) and not has_entity:
+            return False, 0.85, "a fragment without verifiable content"
+        if claim.rstrip().endswith("?"):
+            return False, 0.9, "a question, not a statement"
+        if _OPINION.search(claim):
+            return False, 0.9, "a first person opinion"
+        if _DIGIT.search(claim) and has_entity and not any(w.lower() in _UNRESOLVED for w in words):
+            return True, 0.9, "specific figures about a named entity"
+        return None, 0.0, ""
+
+
+class ModelCheckworthyFilter(CheckworthyFilter):
+    def __init__(self, model, batch_size: int = 64):
+        """Classify claims with a small local model, e.g. a scikit-learn text classification pipeline.
+
+        Args:
+            model: an object with a `predict_proba(texts)` method returning, for each text, the probabilities
+                of not checkworthy and checkworthy.
+            batch_size (int, optional): the number of claims per prediction. Defaults to 64.
+        """
+        self.model = model
+        self.batch_size = batch_size
+
+    def classify(self, claims: list[str]) -> list[tuple]:
+        results = []
+        for i in range(0, len(claims), self.batch_size):
+            for _, p_yes in self.model.predict_proba(claims[i : i + self.batch_size]):
+                p_yes = float(p_yes)
+                results.append((p_yes >= 0.5, max(p_yes, 1 - p_yes), f"local model probability {p_yes:.2f}"))
+        return results
+
+
+class ChainCheckworthyFilter(CheckworthyFilter):
+    def __init__(self, filters: list[CheckworthyFilter]):
+        """Combine filters, e.g. rules then a local model, keeping the most confident decision of each claim."""
+        self.filters = filters
+
+    def classify(self, claims: list[str]) -> list[tuple]:
+        results = [(None, 0.0, "")] * len(claims)
+        for checkworthy_filter in self.filters:
+            pending = [i for i, (_, confidence, _) in enumerate(results) if confidence < 1]
+            if not pending:
+                break
+            for i, result in zip(pending, checkworthy_filter.classify([claims[i] for i in pending])):
+                if result[0] is not None and result[1] > results[i][1]:
+                    results[i] = result
+        return results
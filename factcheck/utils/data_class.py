@@ -9,6 +9,20 @@ class TokenUsage:
     model: str = ""
     prompt_tokens: int = 0
     completion_tokens: Optional[int] = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    throttled_requests: int = 0
+    concurrency_limit: int = 0
+    coalesced_calls: int = 0
+    hedged_requests: int = 0
+    hedge_wins: int = 0
+    retries_avoided: int = 0
+    local_decisions: int = 0
+    calls_saved: int = 0
+    # the verification calls saved by each mechanism of ClaimVerify, also counted in calls_saved
+    early_exit_calls_saved: int = 0
+    gate_calls_saved: int = 0
+    dedup_calls_saved: int = 0
 
 
 @dataclass
@@ -1,10 +1,35 @@
 import time
+import json
 import asyncio
+import hashlib
+import weakref
+import tiktoken
 from abc import abstractmethod
-from functools import partial
 from collections import deque
+from functools import partial
 
 from ..data_class import TokenUsage
+from ..async_util import run_sync
+from ..cache import get_disk_cache
+from ..cassette import intercept, CassetteMiss
+from .rate_limiter import get_rate_limiter
+from .registry import get_api_client, get_async_api_client
+from .concurrency import AdaptiveConcurrency, backoff_delay, get_retry_after, is_overload_error
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text with tiktoken, or by its length if the encoding is unavailable."""
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding is False:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text, disallowed_special=()))
 
 
 class BaseClient:
@@ -14,20 +39,84 @@ class BaseClient:
         api_config: dict,
         max_requests_per_minute: int,
         request_window: int,
+        max_tokens_per_minute: int = None,
     ) -> None:
         self.model = model
         self.api_config = api_config
         self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
         self.request_window = request_window
-        self.traffic_queue = deque()
-        self.total_traffic = 0
-        self.usage = TokenUsage(model=model)
+        # tokens reserved for the completion of a request, until its actual length is known
+        self.expected_completion_tokens = 512
+        # in-flight requests limit, adapted to rate limit errors and latency
+        self.concurrency = AdaptiveConcurrency()
+        self.usage = TokenUsage(model=model, concurrency_limit=self.concurrency.current_limit)
+        # identical requests in flight, per event loop
+        self._in_flight = weakref.WeakKeyDictionary()
+
+        # opt-in request hedging: a call slower than the given percentile of recent latencies is duplicated,
+        # as long as the estimated tokens of the duplicates stay within `hedge_budget` of all tokens sent
+        hedge_percentile = (api_config or {}).get("LLM_HEDGE_PERCENTILE")
+        self.hedge_percentile = float(hedge_percentile) if hedge_percentile else None
+        self.hedge_budget = float((api_config or {}).get("LLM_HEDGE_BUDGET") or 0.1)
+        self.hedge_min_samples = 20
+        self._latencies = deque(maxlen=1000)
+        self._sent_tokens = 0
+        self._hedge_tokens = 0
+
+        # opt-in persistent response cache, shared by all clients using the same file
+        cache_path = (api_config or {}).get("LLM_CACHE_PATH")
+        self.cache = None
+        if cache_path:
+            self.cache = get_disk_cache(
+                cache_path,
+                ttl=float(api_config.get("LLM_CACHE_TTL") or 7 * 24 * 3600),
+                max_size_mb=float(api_config.get("LLM_CACHE_MAX_SIZE_MB") or 512),
+            )
+
+    @property
+    def rate_limiter(self):
+        """The rate limiter of the API account of this client, shared with all other clients of the account."""
+        return get_rate_limiter(
+            self._account_key(), self.max_requests_per_minute, self.max_tokens_per_minute, window=self.request_window
+        )
+
+    def _account_key(self) -> tuple:
+        """Identify the API account of this client, e.g. the provider, the endpoint and the API key.
+        Rate limits and HTTP connection pools are shared by all clients of an account."""
+        return (type(self).__name__,)
 
     @abstractmethod
     def _call(self, messages: str):
         """Internal function to call the API."""
         pass
 
+    async def _acall(self, messages: str, **kwargs):
+        """Internal coroutine to call the API. Clients with a native async API should override it,
+        by default the blocking `_call` is run in a worker thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self._call, messages, **kwargs))
+
+    def _create_client(self, http_client, timeout):
+        """Create the API client, used by `_call`, on top of a pooled `httpx.Client`. Returns None if not supported."""
+        return None
+
+    def _create_async_client(self, http_client, timeout):
+        """Create the native async API client, used by `_acall`, on top of a pooled `httpx.AsyncClient`.
+        Returns None if not supported."""
+        return None
+
+    @property
+    def client(self):
+        """The API client of the account of this client, shared with all other clients of the account."""
+        return get_api_client(self._account_key(), self._create_client, self.api_config)
+
+    @property
+    def async_client(self):
+        """The native async API client of the account of this client bound to the running event loop,
+        shared with all other clients of the account."""
+        return get_async_api_client(self._account_key(), self._create_async_client, self.api_config)
+
     @abstractmethod
     def _log_usage(self):
         """Log the usage of tokens, should be used in each client's _call method."""
@@ -39,30 +128,78 @@ class BaseClient:
     def reset_usage(self):
         self.usage.prompt_tokens = 0
         self.usage.completion_tokens = 0
+        self.usage.cache_hits = 0
+        self.usage.cache_misses = 0
+        self.usage.throttled_requests = 0
+        self.usage.coalesced_calls = 0
+        self.usage.hedged_requests = 0
+        self.usage.hedge_wins = 0
+        self.usage.retries_avoided = 0
+        self.usage.local_decisions = 0
+        self.usage.calls_saved = 0
+        self.usage.early_exit_calls_saved = 0
+        self.usage.gate_calls_saved = 0
+        self.usage.dedup_calls_saved = 0
+
+    def _cache_key(self, messages, seed: int) -> str:
+        payload = json.dumps({"model": self.model, "messages": messages, "seed": seed}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, messages, seed: int):
+        """Look up a cached response, returns None on a miss or if the cache is disabled."""
+        if self.cache is None:
+            return None
+        response = self.cache.get(self._cache_key(messages, seed))
+        if response is None:
+            self.usage.cache_misses += 1
+        else:
+            self.usage.cache_hits += 1
+        return response
+
+    def _cache_set(self, messages, seed: int, response: str):
+        if self.cache is not None and response:
+            self.cache.set(self._cache_key(messages, seed), response)
 
     @abstractmethod
     def construct_message_list(self, prompt_list: list[str]) -> list[str]:
         """Construct a list of messages for the function self.multi_call."""
         raise NotImplementedError
 
-    @abstractmethod
+    def batch_request(self, messages, seed: int = 42) -> dict:
+        """Construct the body of a chat completion request in a batch file, see `factcheck.utils.batch`."""
+        raise NotImplementedError(f"{type(self).__name__} does not support offline batches.")
+
+    @property
+    def supports_offline_batch(self) -> bool:
+        """Whether the client implements `batch_request`, i.e. can be used with an `OfflineBatch`."""
+        return type(self).batch_request is not BaseClient.batch_request
+
     def get_request_length(self, messages):
-        """Get the length of the request. Used for tracking traffic."""
-        raise NotImplementedError
+        """Get the estimated number of prompt tokens of the request. Used for tracking traffic."""
+        if isinstance(messages, str):
+            return count_tokens(messages)
+        # a few tokens of overhead per message for the role and separators
+        return sum(count_tokens(str(message.get("content", ""))) + 4 for message in messages)
 
     def call(self, messages: list[str], num_retries=3, waiting_time=1, **kwargs):
+        return run_sync(self.acall(messages, num_retries=num_retries, waiting_time=waiting_time, **kwargs))
+
+    async def acall(self, messages: list[str], num_retries=3, waiting_time=1, **kwargs):
         seed = kwargs.get("seed", 42)
         assert type(seed) is int, "Seed must be an integer."
         assert len(messages) == 1, "Only one message is allowed for this function."
 
+        r = self._cache_get(messages[0], seed)
+        if r is not None:
+            return r
+
         r = ""
-        for _ in range(num_retries):
-            try:
-                r = self._call(messages[0], seed=seed)
-                break
-            except Exception as e:
-                print(f"Error LLM Client call: {e} Retrying...")
-                time.sleep(waiting_time)
+        try:
+            r = await self._coalesced_acall(messages[0], num_retries=num_retries, waiting_time=waiting_time, seed=seed)
+        except CassetteMiss:
+            raise
+        except Exception as e:
+            print(f"Error LLM Client call: {e}")
 
         if r == "":
             raise ValueError("Failed to get response from LLM Client.")
@@ -71,29 +208,145 @@ class BaseClient:
     def set_model(self, model: str):
         self.model = model
 
-    async def _async_call(self, messages: list, **kwargs):
-        """Calls ChatGPT asynchronously, tracks traffic, and enforces rate limits."""
-        while len(self.traffic_queue) >= self.max_requests_per_minute:
-            await asyncio.sleep(1)
-            self._expire_old_traffic()
+    async def _async_call(self, messages: list, num_retries=3, waiting_time=1, **kwargs):
+        """Calls the LLM asynchronously, with the response cache, retries and rate limits."""
+        seed = kwargs.get("seed", 42)
+        response = self._cache_get(messages, seed)
+        if response is not None:
+            return response
 
-        loop = asyncio.get_running_loop()
-        response = await loop.run_in_executor(None, partial(self._call, messages, **kwargs))
+        return await self._coalesced_acall(messages, num_retries=num_retries, waiting_time=waiting_time, **kwargs)
+
+    async def _coalesced_acall(self, messages, **kwargs):
+        """Calls the LLM and caches the response, identical concurrent requests share one call.
+
+        Requests are identical if they have the same model, messages and seed. The shared call is cancelled
+        only once all of its callers are cancelled.
+        """
+        seed = kwargs.get("seed", 42)
+        key = self._cache_key(messages, seed)
+        in_flight = self._in_flight.setdefault(asyncio.get_running_loop(), {})
+        if key in in_flight:
+            self.usage.coalesced_calls += 1
+            entry = in_flight[key]
+        else:
+            task = asyncio.ensure_future(self._retrying_acall(messages, **kwargs))
+            entry = in_flight[key] = {"task": task, "callers": 0}
+
+            def _done(task):
+                if in_flight.get(key) is entry:
+                    del in_flight[key]
+                if not task.cancelled() and task.exception() is None:
+                    self._cache_set(messages, seed, task.result())
 
-        self.total_traffic += self.get_request_length(messages)
-        self.traffic_queue.append((time.time(), self.get_request_length(messages)))
+            task.add_done_callback(_done)
 
+        entry["callers"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        except asyncio.CancelledError:
+            if entry["callers"] == 1 and not entry["task"].done():
+                entry["task"].cancel()
+            raise
+        finally:
+            entry["callers"] -= 1
+
+    async def _retrying_acall(self, messages, num_retries=3, waiting_time=1, **kwargs):
+        """Calls the LLM, retrying failed attempts with exponential backoff and jitter that honours `Retry-After`."""
+        for attempt in range(num_retries):
+            try:
+                return await self._hedged_acall(messages, **kwargs)
+            except Exception as e:
+                # a replayed run has no other response to retry with
+                if attempt == num_retries - 1 or isinstance(e, CassetteMiss):
+                    raise
+                delay = backoff_delay(attempt, base=waiting_time, retry_after=get_retry_after(e))
+                print(f"Error LLM Client call: {e} Retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+
+    async def _hedged_acall(self, messages, **kwargs):
+        """Calls the LLM, issuing a duplicate request if the call is slower than the hedging percentile.
+        The first response wins and the other request is cancelled."""
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._limited_acall(messages, **kwargs)
+
+        # the hedging delay counts from the moment the request is sent, not while it waits for the limits
+        sent = asyncio.Event()
+        primary = asyncio.ensure_future(self._limited_acall(messages, sent=sent, **kwargs))
+        sent_task = asyncio.ensure_future(sent.wait())
+        tasks = [primary]
+        try:
+            await asyncio.wait([primary, sent_task], return_when=asyncio.FIRST_COMPLETED)
+            sent_at = time.monotonic()
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                estimated_tokens = self.get_request_length(messages) + self.expected_completion_tokens
+                if self._hedge_tokens + estimated_tokens <= self.hedge_budget * self._sent_tokens:
+                    self._hedge_tokens += estimated_tokens
+                    self.usage.hedged_requests += 1
+                    tasks.append(asyncio.ensure_future(self._limited_acall(messages, **kwargs)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    if winner is not primary:
+                        self.usage.hedge_wins += 1
+                        # the cancelled primary took at least this long, without the sample the latency
+                        # percentile would only see the fast calls and drift down
+                        self._latencies.append(time.monotonic() - sent_at)
+                    return winner.result()
+            # all requests failed, report the error of the primary request
+            return primary.result()
+        finally:
+            for task in [sent_task, *tasks]:
+                task.cancel()
+
+    def _hedge_delay(self):
+        """The latency after which a call is hedged, None if hedging is disabled or there are too few samples."""
+        if self.hedge_percentile is None or len(self._latencies) < self.hedge_min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.hedge_percentile / 100))]
+
+    async def _limited_acall(self, messages, sent: asyncio.Event = None, **kwargs):
+        """Calls the LLM once the client has an in-flight slot and the shared rate limiter has capacity.
+        `sent` is set once the request is sent."""
+        prompt_tokens = self.get_request_length(messages)
+        estimated_tokens = prompt_tokens + self.expected_completion_tokens
+        await self.concurrency.acquire()
+        latency, overloaded = None, False
+        try:
+            await self.rate_limiter.acquire(estimated_tokens)
+            self._sent_tokens += estimated_tokens
+            if sent is not None:
+                sent.set()
+            response = None
+            st_time = time.monotonic()
+            try:
+                response = await intercept(
+                    "llm", self._cache_key(messages, kwargs.get("seed", 42)), partial(self._acall, messages, **kwargs)
+                )
+                latency = time.monotonic() - st_time
+                self._latencies.append(latency)
+            finally:
+                actual_tokens = prompt_tokens + (count_tokens(response) if response else 0)
+                self.rate_limiter.settle(estimated_tokens, actual_tokens)
+        except Exception as e:
+            overloaded = is_overload_error(e)
+            if overloaded:
+                self.usage.throttled_requests += 1
+            raise
+        finally:
+            self.concurrency.release(latency=latency, overloaded=overloaded)
+            self.usage.concurrency_limit = self.concurrency.current_limit
         return response
 
     def multi_call(self, messages_list, **kwargs):
+        return run_sync(self.amulti_call(messages_list, **kwargs))
+
+    async def amulti_call(self, messages_list, **kwargs):
         tasks = [self._async_call(messages=messages, **kwargs) for messages in messages_list]
-        asyncio.set_event_loop(asyncio.SelectorEventLoop())
-        loop = asyncio.get_event_loop()
-        responses = loop.run_until_complete(asyncio.gather(*tasks))
+        responses = await asyncio.gather(*tasks)
         return responses
-
-    def _expire_old_traffic(self):
-        """Expires traffic older than the request window."""
-        current_time = time.time()
-        while self.traffic_queue and self.traffic_queue[0][0] + self.request_window < current_time:
-            self.total_traffic -= self.traffic_queue.popleft()[1]
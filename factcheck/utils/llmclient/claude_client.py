@@ -1,5 +1,5 @@
 import time
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 from .base import BaseClient
 
 
@@ -10,9 +10,9 @@ class ClaudeClient(BaseClient):
         api_config: dict = None,
         max_requests_per_minute=200,
         request_window=60,
+        max_tokens_per_minute=80000,
     ):
-        super().__init__(model, api_config, max_requests_per_minute, request_window)
-        self.client = Anthropic(api_key=self.api_config["ANTHROPIC_API_KEY"])
+        super().__init__(model, api_config, max_requests_per_minute, request_window, max_tokens_per_minute)
 
     def _call(self, messages: str, **kwargs):
         response = self.client.messages.create(
@@ -22,8 +22,22 @@ class ClaudeClient(BaseClient):
         )
         return response.content[0].text
 
-    def get_request_length(self, messages):
-        return 1
+    async def _acall(self, messages: str, **kwargs):
+        response = await self.async_client.messages.create(
+            messages=messages,
+            model=self.model,
+            max_tokens=2048,
+        )
+        return response.content[0].text
+
+    def _create_client(self, http_client, timeout):
+        return Anthropic(api_key=self.api_config["ANTHROPIC_API_KEY"], http_client=http_client, timeout=timeout)
+
+    def _create_async_client(self, http_client, timeout):
+        return AsyncAnthropic(api_key=self.api_config["ANTHROPIC_API_KEY"], http_client=http_client, timeout=timeout)
+
+    def _account_key(self):
+        return ("anthropic", self.api_config["ANTHROPIC_API_KEY"])
 
     def construct_message_list(
         self,
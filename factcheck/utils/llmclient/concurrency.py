@@ -0,0 +1,153 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+# status codes of rate limit and overload errors: too many requests, service unavailable, overloaded (Anthropic)
+OVERLOAD_STATUS_CODES = (429, 503, 529)
+
+
+def get_status_code(error: Exception):
+    """Get the HTTP status code of an API error, if any."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code
+
+
+def is_overload_error(error: Exception) -> bool:
+    """Whether an API error means that the API is rate limiting or overloaded."""
+    return get_status_code(error) in OVERLOAD_STATUS_CODES
+
+
+def get_retry_after(error: Exception):
+    """Get the delay in seconds requested by the `Retry-After` header of an API error, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            try:
+                return float(headers["retry-after"])
+            except ValueError:
+                retry_at = parsedate_to_datetime(headers["retry-after"])
+                return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def backoff_delay(attempt: int, base: float = 1, cap: float = 60, retry_after: float = None) -> float:
+    """Exponential backoff with full jitter, never shorter than the delay requested by the API.
+
+    Args:
+        attempt (int): the number of the failed attempt, starting from 0.
+        base (float, optional): the base delay in seconds. Defaults to 1.
+        cap (float, optional): the maximum delay in seconds, unless requested by the API. Defaults to 60.
+        retry_after (float, optional): the delay requested by the API (`Retry-After`). Defaults to None.
+    """
+    delay = random.uniform(0, min(cap, base * 2**attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class AdaptiveConcurrency:
+    def __init__(
+        self,
+        initial_limit: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        """An AIMD limit on the number of in-flight requests of a client.
+
+        The limit grows by one per round of successful requests while their latency stays within
+        `latency_tolerance` times the baseline (the lowest recent latency), and is multiplied by
+        `backoff_factor` on rate limit and overload errors, at most once per round trip.
+        It is thread-safe and can be used from several event loops.
+
+        Args:
+            initial_limit (int, optional): the initial limit. Defaults to 16.
+            min_limit (int, optional): the lower bound of the limit. Defaults to 1.
+            max_limit (int, optional): the upper bound of the limit. Defaults to 256.
+            backoff_factor (float, optional): the multiplicative decrease on overload. Defaults to 0.5.
+            latency_tolerance (float, optional): the latency, relative to the baseline, up to which the limit
+                keeps growing. Defaults to 2.0.
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_factor = backoff_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.baseline_latency = None
+        self._last_decrease = None
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self) -> None:
+        """Wait for an in-flight slot, slots are handed over to waiters in FIFO order."""
+        with self._lock:
+            if not self._waiters and self.in_flight < self.current_limit:
+                self.in_flight += 1
+                return
+            waiter = (asyncio.get_running_loop(), asyncio.Event())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1].wait()
+        except BaseException:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                else:  # the slot was handed over already
+                    self.in_flight -= 1
+                    self._wake()
+            raise
+
+    def release(self, latency: float = None, overloaded: bool = False) -> None:
+        """Free an in-flight slot and adapt the limit to the outcome of the request.
+
+        Args:
+            latency (float, optional): the latency of a successful request in seconds. Defaults to None.
+            overloaded (bool, optional): whether the request failed with a rate limit or overload error.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if overloaded:
+                self._decrease()
+            elif latency is not None:
+                if self.baseline_latency is None or latency < self.baseline_latency:
+                    self.baseline_latency = latency
+                else:
+                    # let the baseline follow slowly if the latency stays higher
+                    self.baseline_latency += 0.01 * (latency - self.baseline_latency)
+                if latency <= self.latency_tolerance * self.baseline_latency:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.current_limit)
+            self._wake()
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        recovery_time = self.baseline_latency or 1.0
+        if self._last_decrease is not None and now - self._last_decrease < recovery_time:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff_factor)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.current_limit:
+            loop, event = self._waiters.popleft()
+            if loop.is_closed():
+                continue
+            self.in_flight += 1
+            loop.call_soon_threadsafe(event.set)
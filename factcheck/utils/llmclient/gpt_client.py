@@ -1,5 +1,5 @@
 import time
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from .base import BaseClient
 
 
@@ -10,9 +10,9 @@ class GPTClient(BaseClient):
         api_config: dict = None,
         max_requests_per_minute=200,
         request_window=60,
+        max_tokens_per_minute=300000,
     ):
-        super().__init__(model, api_config, max_requests_per_minute, request_window)
-        self.client = OpenAI(api_key=self.api_config["OPENAI_API_KEY"])
+        super().__init__(model, api_config, max_requests_per_minute, request_window, max_tokens_per_minute)
 
     def _call(self, messages: str, **kwargs):
         seed = kwargs.get("seed", 42)  # default seed is 42
@@ -24,6 +24,27 @@ class GPTClient(BaseClient):
             model=self.model,
             messages=messages,
         )
+        return self._parse_response(response)
+
+    async def _acall(self, messages: str, **kwargs):
+        seed = kwargs.get("seed", 42)  # default seed is 42
+        assert type(seed) is int, "Seed must be an integer."
+
+        response = await self.async_client.chat.completions.create(
+            response_format={"type": "json_object"},
+            seed=seed,
+            model=self.model,
+            messages=messages,
+        )
+        return self._parse_response(response)
+
+    def _create_client(self, http_client, timeout):
+        return OpenAI(api_key=self.api_config["OPENAI_API_KEY"], http_client=http_client, timeout=timeout)
+
+    def _create_async_client(self, http_client, timeout):
+        return AsyncOpenAI(api_key=self.api_config["OPENAI_API_KEY"], http_client=http_client, timeout=timeout)
+
+    def _parse_response(self, response):
         r = response.choices[0].message.content
 
         if hasattr(response, "usage"):
@@ -40,9 +61,16 @@ class GPTClient(BaseClient):
         except:  # noqa E722
             print("Warning: prompt_tokens or completion_token not found in usage_dict")
 
-    def get_request_length(self, messages):
-        # TODO: check if we should return the len(menages) instead
-        return 1
+    def _account_key(self):
+        return ("openai", self.api_config["OPENAI_API_KEY"])
+
+    def batch_request(self, messages, seed: int = 42):
+        return {
+            "model": self.model,
+            "messages": messages,
+            "seed": seed,
+            "response_format": {"type": "json_object"},
+        }
 
     def construct_message_list(
         self,
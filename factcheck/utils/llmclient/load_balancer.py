@@ -0,0 +1,166 @@
+import time
+import threading
+
+_load_balancers = {}
+_load_balancers_lock = threading.Lock()
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        """The routing state and statistics of one replica of a load balanced API."""
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.total_latency = 0.0
+        self.latency = None  # exponentially weighted moving average, in seconds
+        self.ejections = 0
+        self.ejected_until = None
+        self.checking = False
+        self.first_request_at = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until is None
+
+    def get_stats(self) -> dict:
+        elapsed = time.monotonic() - self.first_request_at if self.first_request_at is not None else 0
+        completed = self.requests - self.failures
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "avg_latency": self.total_latency / completed if completed else None,
+            "ewma_latency": self.latency,
+            "throughput": completed / elapsed if elapsed else None,  # completed requests per second
+        }
+
+
+class LoadBalancer:
+    def __init__(
+        self,
+        urls: list[str],
+        max_failures: int = 3,
+        slow_factor: float = 3.0,
+        min_samples: int = 5,
+        ejection_time: float = 30,
+        max_ejection_time: float = 300,
+    ):
+        """Route requests to the replica with the least outstanding requests, ejecting failing and slow replicas.
+
+        A replica is ejected after `max_failures` consecutive failures, or once its average latency exceeds
+        `slow_factor` times the one of the fastest healthy replica. Ejected replicas are health checked again
+        after `ejection_time` seconds, doubled on each ejection up to `max_ejection_time`. If all replicas are
+        ejected, requests go to the one to be checked first. It is thread-safe and can be used from several
+        event loops.
+
+        Args:
+            urls (list[str]): the base URLs of the replicas.
+            max_failures (int, optional): consecutive failures before ejection. Defaults to 3.
+            slow_factor (float, optional): latency, relative to the fastest replica, before ejection. Defaults to 3.0.
+            min_samples (int, optional): requests to a replica before it can be ejected as slow. Defaults to 5.
+            ejection_time (float, optional): initial ejection time in seconds. Defaults to 30.
+            max_ejection_time (float, optional): maximum ejection time in seconds. Defaults to 300.
+        """
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.max_failures = max_failures
+        self.slow_factor = slow_factor
+        self.min_samples = min_samples
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Endpoint:
+        """Pick the replica for a request and count it as outstanding, release it with `release`."""
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            if candidates:
+                # least outstanding requests, then lowest latency (untried replicas first)
+                endpoint = min(candidates, key=lambda e: (e.outstanding, e.latency or 0))
+            else:
+                endpoint = min(self.endpoints, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            if endpoint.first_request_at is None:
+                endpoint.first_request_at = time.monotonic()
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: float = None, failed: bool = False) -> None:
+        """Record the outcome of a request to a replica, ejecting it if it fails or is too slow.
+
+        Args:
+            endpoint (Endpoint): the replica returned by `acquire`.
+            latency (float, optional): the latency of a successful request in seconds. Defaults to None.
+            failed (bool, optional): whether the request failed. Defaults to False.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.max_failures:
+                    self._eject(endpoint)
+                return
+
+            endpoint.consecutive_failures = 0
+            if latency is None:
+                return
+            endpoint.total_latency += latency
+            endpoint.latency = latency if endpoint.latency is None else 0.8 * endpoint.latency + 0.2 * latency
+            if endpoint.healthy and endpoint.requests - endpoint.failures >= self.min_samples:
+                others = [
+                    e.latency
+                    for e in self.endpoints
+                    if e is not endpoint
+                    and e.healthy
+                    and e.latency is not None
+                    and e.requests - e.failures >= self.min_samples
+                ]
+                if others and endpoint.latency > self.slow_factor * min(others):
+                    self._eject(endpoint)
+
+    def due_for_check(self) -> list[Endpoint]:
+        """Get the ejected replicas due for a health check, and mark them as being checked."""
+        now = time.monotonic()
+        with self._lock:
+            due = [e for e in self.endpoints if not e.healthy and not e.checking and e.ejected_until <= now]
+            for endpoint in due:
+                endpoint.checking = True
+            return due
+
+    def report_health(self, endpoint: Endpoint, healthy: bool) -> None:
+        """Record the result of a health check, reinstating the replica or ejecting it again. `healthy` is None
+        if the check did not complete, e.g. it was cancelled: the replica is then due for a check again."""
+        with self._lock:
+            endpoint.checking = False
+            if healthy is None:
+                return
+            if healthy:
+                endpoint.ejected_until = None
+                endpoint.consecutive_failures = 0
+                # forget the latency which got the replica ejected
+                endpoint.latency = None
+            else:
+                self._eject(endpoint)
+
+    def get_stats(self) -> list[dict]:
+        """Get the latency and throughput statistics of each replica."""
+        with self._lock:
+            return [endpoint.get_stats() for endpoint in self.endpoints]
+
+    def _eject(self, endpoint: Endpoint) -> None:
+        endpoint.ejections += 1
+        ejection_time = min(self.max_ejection_time, self.ejection_time * 2 ** (endpoint.ejections - 1))
+        endpoint.ejected_until = time.monotonic() + ejection_time
+
+
+def get_load_balancer(key: tuple, urls: list[str]) -> LoadBalancer:
+    """Get the LoadBalancer of the replicas of an API account, shared by all clients in this process."""
+    with _load_balancers_lock:
+        if key not in _load_balancers:
+            _load_balancers[key] = LoadBalancer(urls)
+        return _load_balancers[key]
@@ -1,12 +1,18 @@
 import time
-import openai
-from openai import OpenAI
+import asyncio
+from functools import partial
+from openai import OpenAI, AsyncOpenAI
 from .base import BaseClient
+from .registry import get_api_client, get_async_api_client
+from .load_balancer import get_load_balancer
 
 
 class LocalOpenAIClient(BaseClient):
     """Support Local host LLM chatbot with OpenAI API.
     see https://github.com/lm-sys/FastChat/blob/main/docs/openai_api.md for example usage.
+
+    `LOCAL_API_URL` may list several replicas serving the same model (a list, or comma-separated URLs),
+    requests are then load balanced across them, see `LoadBalancer`.
     """
 
     def __init__(
@@ -15,28 +21,124 @@ class LocalOpenAIClient(BaseClient):
         api_config: dict = None,
         max_requests_per_minute=200,
         request_window=60,
+        max_tokens_per_minute=None,
     ):
-        super().__init__(model, api_config, max_requests_per_minute, request_window)
-
-        openai.api_key = api_config["LOCAL_API_KEY"]
-        openai.base_url = api_config["LOCAL_API_URL"]
+        super().__init__(model, api_config, max_requests_per_minute, request_window, max_tokens_per_minute)
+        urls = api_config["LOCAL_API_URL"]
+        if isinstance(urls, str):
+            urls = [url.strip() for url in urls.split(",") if url.strip()]
+        self.urls = list(urls)
+        self.balancer = get_load_balancer(self._account_key(), self.urls)
+        # keep a reference to the running health checks, so that they are not garbage collected
+        self._health_checks = set()
 
     def _call(self, messages: str, **kwargs):
         seed = kwargs.get("seed", 42)  # default seed is 42
         assert type(seed) is int, "Seed must be an integer."
 
-        response = openai.chat.completions.create(
-            response_format={"type": "json_object"},
-            seed=seed,
-            model=self.model,
-            messages=messages,
-        )
+        for endpoint in self.balancer.due_for_check():
+            self.balancer.report_health(endpoint, self._check_health(endpoint))
+
+        endpoint = self.balancer.acquire()
+        st_time = time.monotonic()
+        try:
+            response = self._endpoint_client(endpoint.url).chat.completions.create(
+                response_format={"type": "json_object"},
+                seed=seed,
+                model=self.model,
+                messages=messages,
+            )
+        except Exception:
+            self.balancer.release(endpoint, failed=True)
+            raise
+        self.balancer.release(endpoint, latency=time.monotonic() - st_time)
+        r = response.choices[0].message.content
+        return r
+
+    async def _acall(self, messages: str, **kwargs):
+        seed = kwargs.get("seed", 42)  # default seed is 42
+        assert type(seed) is int, "Seed must be an integer."
+
+        for endpoint in self.balancer.due_for_check():
+            task = asyncio.ensure_future(self._acheck_health(endpoint))
+            self._health_checks.add(task)
+            task.add_done_callback(self._health_checks.discard)
+
+        endpoint = self.balancer.acquire()
+        st_time = time.monotonic()
+        try:
+            response = await self._endpoint_async_client(endpoint.url).chat.completions.create(
+                response_format={"type": "json_object"},
+                seed=seed,
+                model=self.model,
+                messages=messages,
+            )
+        except asyncio.CancelledError:
+            self.balancer.release(endpoint)
+            raise
+        except Exception:
+            self.balancer.release(endpoint, failed=True)
+            raise
+        self.balancer.release(endpoint, latency=time.monotonic() - st_time)
         r = response.choices[0].message.content
         return r
 
-    def get_request_length(self, messages):
-        # TODO: check if we should return the len(menages) instead
-        return 1
+    def _check_health(self, endpoint) -> bool:
+        try:
+            self._endpoint_client(endpoint.url).with_options(timeout=10).models.list()
+            return True
+        except Exception:
+            return False
+
+    async def _acheck_health(self, endpoint) -> None:
+        healthy = None
+        try:
+            await self._endpoint_async_client(endpoint.url).with_options(timeout=10).models.list()
+            healthy = True
+        except Exception:
+            healthy = False
+        finally:
+            # always clear the check, even if cancelled, or the replica would never be checked again
+            self.balancer.report_health(endpoint, healthy)
+
+    def get_endpoint_stats(self) -> list[dict]:
+        """Get the health, latency and throughput statistics of each replica."""
+        return self.balancer.get_stats()
+
+    def _endpoint_client(self, url: str):
+        key = ("local_openai", url, self.api_config["LOCAL_API_KEY"])
+        return get_api_client(key, partial(self._create_client, base_url=url), self.api_config)
+
+    def _endpoint_async_client(self, url: str):
+        key = ("local_openai", url, self.api_config["LOCAL_API_KEY"])
+        return get_async_api_client(key, partial(self._create_async_client, base_url=url), self.api_config)
+
+    def _create_client(self, http_client, timeout, base_url: str = None):
+        return OpenAI(
+            api_key=self.api_config["LOCAL_API_KEY"],
+            base_url=base_url or self.urls[0],
+            http_client=http_client,
+            timeout=timeout,
+        )
+
+    def _create_async_client(self, http_client, timeout, base_url: str = None):
+        return AsyncOpenAI(
+            api_key=self.api_config["LOCAL_API_KEY"],
+            base_url=base_url or self.urls[0],
+            http_client=http_client,
+            timeout=timeout,
+        )
+
+    def _account_key(self):
+        return ("local_openai", tuple(self.urls), self.api_config["LOCAL_API_KEY"])
+
+    def batch_request(self, messages, seed: int = 42):
+        return {
+            "model": self.model,
+            "messages": messages,
+            "seed": seed,
+            "response_format": {"type": "json_object"},
+        }
 
     def construct_message_list(
         self,
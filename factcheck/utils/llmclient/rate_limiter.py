@@ -0,0 +1,106 @@
+import time
+import asyncio
+import threading
+from collections import deque
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+class _TokenBucket:
+    def __init__(self, capacity: float, window: float):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+
+class RateLimiter:
+    def __init__(self, max_requests_per_minute: int, max_tokens_per_minute: int = None, window: float = 60):
+        """A token-bucket rate limiter on both requests and tokens, shared by all clients of an API account.
+
+        Waiters are served in FIFO order, and each sleeps exactly until the buckets hold enough capacity,
+        or until capacity is returned by `settle`. It is thread-safe and can be used from several event loops.
+
+        Args:
+            max_requests_per_minute (int): maximum number of requests per window.
+            max_tokens_per_minute (int, optional): maximum number of tokens per window. Defaults to None (unlimited).
+            window (float, optional): the window of the limits in seconds. Defaults to 60.
+        """
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self._requests = _TokenBucket(max_requests_per_minute, window)
+        self._tokens = _TokenBucket(max_tokens_per_minute, window) if max_tokens_per_minute else None
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until one request of `tokens` tokens can be sent, then consume its capacity.
+
+        Args:
+            tokens (int, optional): the estimated number of tokens of the request. Defaults to 0.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Event())
+        with self._lock:
+            self._waiters.append(waiter)
+        try:
+            while True:
+                with self._lock:
+                    wait = None  # not our turn, wait until notified
+                    if self._waiters[0] is waiter:
+                        now = time.monotonic()
+                        self._requests.refill(now)
+                        wait = self._requests.time_until(1)
+                        if self._tokens is not None:
+                            self._tokens.refill(now)
+                            wait = max(wait, self._tokens.time_until(tokens))
+                        if wait <= 0:
+                            self._requests.level -= 1
+                            if self._tokens is not None:
+                                self._tokens.level -= min(tokens, self._tokens.capacity)
+                            self._waiters.popleft()
+                            self._notify_head()
+                            return
+                    waiter[1].clear()
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self._notify_head()
+            raise
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once the actual size of a request is known, waking up waiters on a refund."""
+        if self._tokens is None:
+            return
+        with self._lock:
+            self._tokens.level = min(self._tokens.capacity, self._tokens.level + estimated_tokens - actual_tokens)
+            if actual_tokens < estimated_tokens:
+                self._notify_head()
+
+    def _notify_head(self) -> None:
+        if self._waiters:
+            loop, event = self._waiters[0]
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+
+def get_rate_limiter(key: tuple, max_requests_per_minute: int, max_tokens_per_minute: int = None, window: float = 60):
+    """Get the RateLimiter of an API account (e.g. provider and API key), shared by all clients in this process.
+    The limits of the first client of an account apply."""
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(max_requests_per_minute, max_tokens_per_minute, window)
+        return _rate_limiters[key]
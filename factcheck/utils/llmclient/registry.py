@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import weakref
+
+import httpx
+
+_clients = {}
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def get_http_settings(api_config: dict) -> dict:
+    """Get the connection pool limits and timeout of the HTTP transports, from the API configuration.
+
+    Args:
+        api_config (dict): the API configuration, see `LLM_MAX_CONNECTIONS`, `LLM_MAX_KEEPALIVE_CONNECTIONS`,
+            `LLM_KEEPALIVE_EXPIRY` and `LLM_TIMEOUT`.
+
+    Returns:
+        dict: the `limits` and `timeout` of the transports.
+    """
+    api_config = api_config or {}
+    limits = httpx.Limits(
+        max_connections=int(api_config.get("LLM_MAX_CONNECTIONS") or 100),
+        max_keepalive_connections=int(api_config.get("LLM_MAX_KEEPALIVE_CONNECTIONS") or 20),
+        keepalive_expiry=float(api_config.get("LLM_KEEPALIVE_EXPIRY") or 60),
+    )
+    timeout = httpx.Timeout(float(api_config.get("LLM_TIMEOUT") or 600), connect=10.0)
+    return {"limits": limits, "timeout": timeout}
+
+
+def get_api_client(key: tuple, create_client, api_config: dict):
+    """Get the API client of an account (e.g. provider, endpoint and API key), shared by all LLM clients in this
+    process, so that they reuse one pool of keep-alive connections. The settings of the first client apply.
+
+    Args:
+        key (tuple): the account of the API client.
+        create_client (Callable): creates the API client from an `httpx.Client` and a timeout.
+        api_config (dict): the API configuration, see `get_http_settings`.
+
+    Returns:
+        any: the API client, e.g. `openai.OpenAI`.
+    """
+    with _clients_lock:
+        if key not in _clients:
+            settings = get_http_settings(api_config)
+            _clients[key] = create_client(httpx.Client(**settings), settings["timeout"])
+        return _clients[key]
+
+
+def get_async_api_client(key: tuple, create_client, api_config: dict):
+    """Get the async API client of an account bound to the running event loop, see `get_api_client`.
+
+    Args:
+        key (tuple): the account of the API client.
+        create_client (Callable): creates the async API client from an `httpx.AsyncClient` and a timeout.
+        api_config (dict): the API configuration, see `get_http_settings`.
+
+    Returns:
+        any: the async API client, e.g. `openai.AsyncOpenAI`.
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        if key not in clients:
+            settings = get_http_settings(api_config)
+            clients[key] = create_client(httpx.AsyncClient(**settings), settings["timeout"])
+        return clients[key]
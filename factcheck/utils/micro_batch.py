@@ -0,0 +1,57 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class MicroBatcher:
+    def __init__(self, run: Callable[[dict], Awaitable[dict]], window: float = 0.01):
+        """Merge the requests submitted within a short window into one call of `run`.
+
+        Used where the pipeline works claim by claim (speculative retrieval, streaming), so that concurrent
+        claims still share the batched LLM prompts, the cross-claim query merging and the Serper batches.
+
+        Args:
+            run (Callable): a coroutine function mapping a dict keyed by claim to a dict with the same keys.
+            window (float, optional): seconds to wait for other requests after the first one. Defaults to 0.01.
+        """
+        self.run = run
+        self.window = window
+        # the batch being filled on each event loop, as (items, future of the results)
+        self._pending = {}
+        # keep a reference to the running batches, so that they are not garbage collected
+        self._flushes = set()
+
+    async def submit(self, items: dict) -> dict:
+        """Add items to the current batch, and wait for their results.
+
+        Args:
+            items (dict): the items keyed by claim, e.g. {claim: queries}.
+
+        Returns:
+            dict: the results of the submitted keys. Raises the error of the batch if it failed.
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(loop)
+        if batch is None:
+            future = loop.create_future()
+            # the batch keeps running if its callers are cancelled, retrieve its error to avoid warnings
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            batch = self._pending[loop] = ({}, future)
+            loop.call_later(self.window, self._start_flush, loop)
+        batch[0].update(items)
+        results = await asyncio.shield(batch[1])
+        return {key: results[key] for key in items}
+
+    def _start_flush(self, loop) -> None:
+        task = loop.create_task(self._flush(loop))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, loop) -> None:
+        items, future = self._pending.pop(loop)
+        try:
+            future.set_result(await self.run(items))
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
@@ -0,0 +1,93 @@
+import re
+import hashlib
+
+# words, keeping the symbols which change their meaning ("C++", "C#", "AT&T")
+_TOKEN = re.compile(r"\w+(?:[+#&]+\w*)*")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def _shingles(text: str, shingle_size: int) -> set:
+    tokens = _TOKEN.findall(text.lower())
+    return {" ".join(tokens[i : i + shingle_size]) for i in range(max(1, len(tokens) - shingle_size + 1))}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def simhash(text: str, shingle_size: int = 3, bits: int = 64) -> int:
+    """SimHash fingerprint of a text over its word shingles, similar texts have close fingerprints.
+
+    Args:
+        text (str): the text, lowercased and split into words.
+        shingle_size (int, optional): the number of words per shingle. Defaults to 3.
+        bits (int, optional): the number of bits of the fingerprint, at most 64. Defaults to 64.
+
+    Returns:
+        int: the fingerprint.
+    """
+    shingles = _shingles(text, shingle_size)
+    weights = [0] * bits
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for b in range(bits):
+            weights[b] += 1 if h >> b & 1 else -1
+    return sum(1 << b for b in range(bits) if weights[b] > 0)
+
+
+def cluster_near_duplicates(
+    texts: list[str],
+    max_distance: int = 3,
+    shingle_size: int = 3,
+    bits: int = 64,
+    min_jaccard: float = 0.9,
+    match_numbers: bool = True,
+) -> list[int]:
+    """Cluster near-duplicate texts, i.e. whose word shingles have a Jaccard similarity of at least `min_jaccard`.
+
+    SimHash fingerprints only find the candidates: they are split into `max_distance + 1` bands, two fingerprints
+    within `max_distance` bits share at least one band, so each text is only compared to the cluster
+    representatives sharing a band with it, which keeps the clustering linear in the number of texts. Since a
+    small edit changing the meaning (a negation, a year) can be closer in Hamming distance than a cosmetic one,
+    each candidate is then confirmed on the shingles themselves.
+
+    Args:
+        texts (list[str]): the texts.
+        max_distance (int, optional): the maximum Hamming distance of candidate near-duplicates. Defaults to 3.
+        shingle_size (int, optional): the number of words per shingle. Defaults to 3.
+        bits (int, optional): the number of bits of the fingerprints. Defaults to 64.
+        min_jaccard (float, optional): the minimum Jaccard similarity of the shingles of near-duplicates.
+            Defaults to 0.9.
+        match_numbers (bool, optional): near-duplicates must also contain the same numbers. Defaults to True.
+
+    Returns:
+        list[int]: for each text, the index of the representative of its cluster, its first text.
+    """
+    num_bands = max_distance + 1
+    band_size = -(-bits // num_bands)
+    mask = (1 << band_size) - 1
+    buckets = {}
+    representatives = []
+    for i, text in enumerate(texts):
+        shingles = _shingles(text, shingle_size)
+        numbers = set(_NUMBER.findall(text)) if match_numbers else None
+        fingerprint = simhash(text, shingle_size=shingle_size, bits=bits)
+        bands = [(b, fingerprint >> (b * band_size) & mask) for b in range(num_bands)]
+        representative = None
+        for band in bands:
+            for j, other, other_shingles, other_numbers in buckets.get(band, []):
+                if (
+                    bin(fingerprint ^ other).count("1") <= max_distance
+                    and numbers == other_numbers
+                    and _jaccard(shingles, other_shingles) >= min_jaccard
+                ):
+                    representative = j
+                    break
+            if representative is not None:
+                break
+        if representative is None:
+            representative = i
+            for band in bands:
+                buckets.setdefault(band, []).append((i, fingerprint, shingles, numbers))
+        representatives.append(representative)
+    return representatives
@@ -0,0 +1,145 @@
+import re
+import ast
+import json
+
+_CODE_FENCE = re.compile(r"```(?:json|python)?\s*(.*?)\s*(?:```|$)", re.DOTALL | re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+# limit the number of cut points tried when closing a truncated output
+_MAX_TRUNCATION_CANDIDATES = 50
+
+
+def _loads(text: str):
+    """Parse JSON, or a python literal (single quotes, True/False/None), raise ValueError if neither."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        raise ValueError("Not a JSON object or python literal.")
+
+
+def _loads_lenient(text: str):
+    try:
+        return _loads(text)
+    except ValueError:
+        return _loads(_TRAILING_COMMA.sub(r"\1", text))
+
+
+def _close_truncated(text: str):
+    """Close an output truncated in the middle of a list or object, dropping its incomplete last element."""
+    stack, cut_points = [], []
+    quote, escape = None, False
+    for i, ch in enumerate(text):
+        if quote is not None:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+        elif ch == "," and stack:
+            cut_points.append((i, list(stack)))
+
+    if quote is None and not stack:
+        raise ValueError("Output is not truncated.")
+    candidates = [] if quote is not None else [(len(text), stack)]
+    candidates += cut_points[::-1][:_MAX_TRUNCATION_CANDIDATES]
+    for pos, open_brackets in candidates:
+        try:
+            return _loads_lenient(text[:pos].rstrip().rstrip(",") + "".join(reversed(open_brackets)))
+        except ValueError:
+            continue
+    raise ValueError("Cannot close the truncated output.")
+
+
+def extract_json(text: str):
+    """Extract a JSON object (or python literal) from an LLM output, repairing common defects:
+    code fences, surrounding text, trailing commas, single quotes and truncated lists.
+
+    Args:
+        text (str): the LLM output.
+
+    Returns:
+        tuple: the parsed object, and whether the output had to be repaired.
+    """
+    if not isinstance(text, str):
+        raise ValueError(f"Expect a string output, got {type(text).__name__}.")
+    text = text.strip()
+    try:
+        return _loads(text), False
+    except ValueError:
+        pass
+
+    fenced = _CODE_FENCE.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("No JSON object found in the output.")
+    text = text[min(starts) :]
+    end = max(text.rfind("}"), text.rfind("]"))
+
+    for candidate in [text[: end + 1], text] if end != -1 else [text]:
+        try:
+            return _loads_lenient(candidate), True
+        except ValueError:
+            continue
+    return _close_truncated(text), True
+
+
+def validate_schema(obj, schema, path: str = "output"):
+    """Validate a parsed output against a schema, raise ValueError if it does not match.
+
+    A schema is a type (e.g. `str`), a list of one item schema (e.g. `[str]`), a dict of required keys and
+    their schemas (e.g. `{"claims": [str]}`), or a dict with a single type key for a mapping of arbitrary
+    keys (e.g. `{str: str}`).
+    """
+    if isinstance(schema, list):
+        if not isinstance(obj, list):
+            raise ValueError(f"{path} should be a list, got {type(obj).__name__}.")
+        for i, item in enumerate(obj):
+            validate_schema(item, schema[0], f"{path}[{i}]")
+    elif isinstance(schema, dict):
+        if not isinstance(obj, dict):
+            raise ValueError(f"{path} should be a dict, got {type(obj).__name__}.")
+        if len(schema) == 1 and isinstance(next(iter(schema)), type):
+            key_type, value_schema = next(iter(schema.items()))
+            for key, value in obj.items():
+                if not isinstance(key, key_type):
+                    raise ValueError(f"{path} key {key!r} should be a {key_type.__name__}.")
+                validate_schema(value, value_schema, f"{path}[{key!r}]")
+        else:
+            for key, value_schema in schema.items():
+                if key not in obj:
+                    raise ValueError(f"{path} misses the key {key!r}.")
+                validate_schema(obj[key], value_schema, f"{path}[{key!r}]")
+    elif not isinstance(obj, schema):
+        raise ValueError(f"{path} should be a {schema.__name__}, got {type(obj).__name__}.")
+    return obj
+
+
+def parse_llm_output(response: str, schema, usage=None):
+    """Parse an LLM output with `extract_json` and validate it with `validate_schema`.
+
+    Args:
+        response (str): the LLM output.
+        schema (type | list | dict): the expected structure of the output.
+        usage (TokenUsage, optional): counts the outputs which had to be repaired, i.e. the retries avoided.
+
+    Returns:
+        any: the parsed output, raise ValueError if it cannot be parsed or does not match the schema.
+    """
+    obj, repaired = extract_json(response)
+    validate_schema(obj, schema)
+    if repaired and usage is not None:
+        usage.retries_avoided += 1
+    return obj
@@ -6,4 +6,6 @@ class BasePrompt:
     decompose_prompt: str = None
     checkworthy_prompt: str = None
     qgen_prompt: str = None
+    qgen_batch_prompt: str = None
     verify_prompt: str = None
+    verify_batch_prompt: str = None
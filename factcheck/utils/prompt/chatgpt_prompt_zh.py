@@ -64,6 +64,20 @@ qgen_prompt_zh = """给定一个命题，你的任务是创建最少数量的问
 输出:
 """
 
+qgen_batch_prompt_zh = """给定一个编号的命题列表，你的任务是为每个命题创建最少数量的问题，以验证命题的正确性。输出为JSON格式，key是命题的编号，value是问题列表。例如:
+
+命题:
+1. 你的鼻子呼吸在两个鼻孔之间来回切换。当你睡觉时，大约每45分钟换一次。这是为了防止粘液积聚。这个现象叫做鼻腔循环。
+2. 斯坦福监狱实验是在斯坦福大学心理学大楼恩西纳大厅的地下室进行的。
+3. Havel-Hakimi算法是一种将图的邻接矩阵转换为其邻接表的算法。它以瓦茨拉夫·哈维尔和萨米·哈基米的名字命名。
+输出:
+{{"1": ["你的鼻子呼吸会在鼻孔之间交换吗?","你的鼻子呼吸多久交换一次?","你的鼻孔呼吸为什么会交换?","什么是鼻循环?"], "2": ["斯坦福监狱实验是在哪里进行的?"], "3": ["Havel-Hakimi算法是做什么的?","Havel-Hakimi算法是以谁命名的?"]}}
+
+命题:
+{claims}
+输出:
+"""
+
 verify_prompt_zh = """你的任务是使用陈述附带的证据(evidence)来评估其陈述的准确性。仔细审查这些证据，注意它可能在细节上有所不同，有时会呈现相互矛盾的信息。你的判断应该根据这些证据，并考虑其相关性和可靠性。
 
 请记住，证据中缺乏细节并不一定表明陈述是不准确的。在评估陈述的真实性时，要区分错误和证据支持陈述的地方。
@@ -106,9 +120,32 @@ verify_prompt_zh = """你的任务是使用陈述附带的证据(evidence)来评
 
 输出:
 """
+verify_batch_prompt_zh = """你的任务是判断每条编号的证据(evidence)是支持(SUPPORTS)、反驳(REFUTES)命题，还是与命题无关(IRRELEVANT)。仔细审查这些证据，注意它们可能在细节上有所不同，有时会呈现相互矛盾的信息。你对每条证据的判断应该根据其自身内容，并考虑其相关性和可靠性。
+输出为JSON格式，key是证据的编号，value包含以下两个key:
+- "reasoning": 解释你做出判断的思考过程。
+- "relationship": 立场标签，可以是"SUPPORTS"、"REFUTES"或"IRRELEVANT"之一。
+例如:
+[命题]:MBZUAI位于阿拉伯联合酋长国阿布扎比。
+[证据]:
+1. MBZUAI在哪里?\n答案:马斯达尔城-阿布扎比-阿拉伯联合酋长国
+2. 国际商业机器公司，绰号“蓝色巨人”，是一家总部位于纽约州阿蒙克的美国跨国科技公司，业务遍及175多个国家。
+输出:
+{{
+    "1": {{"reasoning": "证据证实MBZUAI位于阿拉伯联合酋长国阿布扎比的马斯达尔城，因此证据支持该命题。", "relationship": "SUPPORTS"}},
+    "2": {{"reasoning": "证据是关于IBM的，而命题是关于MBZUAI的，因此证据与命题无关。", "relationship": "IRRELEVANT"}}
+}}
+
+[命题]:{claim}
+[证据]:
+{evidences}
+输出:
+"""
+
 
 class ChatGPTPromptZH:
     decompose_prompt = decompose_prompt_zh
     checkworthy_prompt = checkworthy_prompt_zh
     qgen_prompt = qgen_prompt_zh
+    qgen_batch_prompt = qgen_batch_prompt_zh
     verify_prompt = verify_prompt_zh
+    verify_batch_prompt = verify_batch_prompt_zh
@@ -61,6 +61,20 @@ Claim: {claim}
 JSON Output:
 """
 
+qgen_batch_prompt = """Given a numbered list of claims, your task is to create, for each claim, minimum number of questions need to be check to verify the correctness of the claim. Output in JSON format with the number of each claim as key, the value is a list of questions. For example:
+
+Claims:
+1. Your nose switches back and forth between nostrils. When you sleep, you switch about every 45 minutes. This is to prevent a buildup of mucus. It’s called the nasal cycle.
+2. The Stanford Prison Experiment was conducted in the basement of Encina Hall, Stanford’s psychology building.
+3. The Havel-Hakimi algorithm is an algorithm for converting the adjacency matrix of a graph into its adjacency list. It is named after Vaclav Havel and Samih Hakimi.
+JSON Output:
+{{"1": ["Does your nose switch between nostrils?", "How often does your nostrils switch?", "Why does your nostril switch?", "What is nasal cycle?"], "2": ["Where was Stanford Prison Experiment was conducted?"], "3": ["What does Havel-Hakimi algorithm do?", "Who are Havel-Hakimi algorithm named after?"]}}
+
+Claims:
+{claims}
+JSON Output:
+"""
+
 verify_prompt = """
 Your task is to evaluate the accuracy of a provided statement using the accompanying evidence. Carefully review the evidence, noting that it may vary in detail and sometimes present conflicting information. Your judgment should be informed by this evidence, taking into account its relevance and reliability.
 
@@ -106,9 +120,40 @@ Input
 JSON Output:
 """
 
+verify_batch_prompt = """
+Your task is to decide, for each numbered evidence, whether it supports, refutes, or is irrelevant to the claim. Carefully review the evidences, noting that they may vary in detail and sometimes present conflicting information. Your judgment of each evidence should be informed by its own content, taking into account its relevance and reliability.
+Please structure your response in JSON format, with the number of each evidence as key, and as value an object including the following two keys:
+- "reasoning": explain the thought process behind your judgment.
+- "relationship": the stance label, which can be one of "SUPPORTS", "REFUTES", or "IRRELEVANT".
+For example,
+Input:
+[claim]: MBZUAI is located in Abu Dhabi, United Arab Emirates.
+[evidences]:
+1. Where is MBZUAI located?\nAnswer: Masdar City - Abu Dhabi - United Arab Emirates
+2. International Business Machines Corporation, nicknamed Big Blue, is an American multinational technology company headquartered in Armonk, New York and present in over 175 countries.
+JSON Output:
+{{
+    "1": {{
+        "reasoning": "The evidence confirms that MBZUAI is located in Masdar City, Abu Dhabi, United Arab Emirates, so the relationship is SUPPORTS.",
+        "relationship": "SUPPORTS"
+    }},
+    "2": {{
+        "reasoning": "The evidence is about IBM, while the claim is about MBZUAI. Therefore, the evidence is irrelevant to the claim",
+        "relationship": "IRRELEVANT"
+    }}
+}}
+Input:
+[claim]: {claim}
+[evidences]:
+{evidences}
+JSON Output:
+"""
+
 
 class ClaudePrompt:
     decompose_prompt = decompose_prompt
     checkworthy_prompt = checkworthy_prompt
     qgen_prompt = qgen_prompt
+    qgen_batch_prompt = qgen_batch_prompt
     verify_prompt = verify_prompt
+    verify_batch_prompt = verify_batch_prompt
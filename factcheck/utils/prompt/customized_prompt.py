@@ -22,6 +22,12 @@ class CustomizedPrompt(BasePrompt):
             assert key in self.prompts, f"Key {key} not found in the prompt yaml file."
             setattr(self, key, self.prompts[key])
 
+        # optional prompts, the features using them are disabled if they are missing
+        optional_keys = ["qgen_batch_prompt", "verify_batch_prompt"]
+        for key in optional_keys:
+            if key in self.prompts:
+                setattr(self, key, self.prompts[key])
+
     def load_prompt_yaml(self, prompt_name):
         # Load the prompt from a yaml file
         with open(prompt_name, "r") as file:
@@ -0,0 +1,198 @@
+import re
+from nltk.stem import PorterStemmer
+
+_TOKEN = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+|\n+")
+# function words carry no alignment signal, they are ignored when matching claims to spans
+_STOPWORDS = set(
+    "a an the and or but if of at by for with about to from in on into over under as is are was were be been being "
+    "am do does did doesn don didn isn aren wasn weren has have had hasn haven hadn t s it its it's this that these "
+    "those he she they we you i his her their our your my him them us me who whom which what there then than so "
+    "not no very can could will would should may might must also".split()
+)
+
+# clauses often start after punctuation or at a conjunction, chunks preferably start there on ties
+_CLAUSE_PUNCTUATION = re.compile(r"[,;:()\u2013\u2014]")
+_CONJUNCTIONS = {"and", "but", "or", "while", "whereas", "although", "though", "which", "who"}
+
+_stemmer = PorterStemmer()
+
+
+def _stem(token: str) -> str:
+    return _stemmer.stem(token.lower())
+
+
+def _content_stems(text: str) -> set:
+    return {_stem(t) for t in _TOKEN.findall(text) if t.lower() not in _STOPWORDS}
+
+
+def _coverage(stems: set, chunk_stems: set) -> float:
+    return len(stems & chunk_stems) / len(stems) if stems else 1.0
+
+
+def _distinct_stems(claim_stems: list, i: int) -> set:
+    """The stems of claim i not shared with the previous and next claims, all its stems if none."""
+    neighbours = set().union(*claim_stems[max(0, i - 1) : i], *claim_stems[i + 1 : i + 2])
+    return claim_stems[i] - neighbours or claim_stems[i]
+
+
+def sentence_spans(text: str) -> list[tuple[int, int]]:
+    """Split a text into sentences at sentence-final punctuation followed by whitespace, and at line breaks.
+
+    Returns:
+        list: the (start, end) offsets of the non-empty sentences.
+    """
+    spans, start = [], 0
+    for m in list(_SENTENCE_END.finditer(text)) + [None]:
+        end = m.start() if m else len(text)
+        if text[start:end].strip():
+            spans.append((start, end))
+        start = m.end() if m else end
+    return spans
+
+
+def _split_chunks(token_stems: list, claim_stems: list, clause_starts: list) -> list:
+    """Split the tokens of a sentence into one contiguous chunk per claim, in order, maximising the number of
+    claim stems found in their own chunk. Stems shared by all claims (e.g. a common subject) are not counted,
+    and ties are broken in favour of chunks starting a clause (`clause_starts`).
+
+    Returns:
+        list[int]: the k + 1 chunk boundaries, as token indices.
+    """
+    k, m = len(claim_stems), len(token_stems)
+    if k == 1:
+        return [0, m]
+    shared = set.intersection(*claim_stems)
+    claim_stems = [stems - shared for stems in claim_stems]
+    min_size = 1 if m >= k else 0
+
+    # best[q][b]: best score of the first q chunks covering tokens[:b]
+    neg = float("-inf")
+    best = [[neg] * (m + 1) for _ in range(k + 1)]
+    back = [[0] * (m + 1) for _ in range(k + 1)]
+    best[0][0] = 0
+    for q in range(1, k + 1):
+        stems = claim_stems[q - 1]
+        for b in range(m + 1):
+            # grow the chunk tokens[a:b] leftwards, counting the claim stems it contains
+            seen, matched = set(), 0
+            for a in range(b, -1, -1):
+                if a < b and token_stems[a] in stems and token_stems[a] not in seen:
+                    seen.add(token_stems[a])
+                    matched += 1
+                if b - a < min_size or best[q - 1][a] == neg:
+                    continue
+                score = best[q - 1][a] + matched + (0.01 if a < m and clause_starts[a] else 0)
+                if score > best[q][b]:
+                    best[q][b], back[q][b] = score, a
+    boundaries = [m]
+    for q in range(k, 0, -1):
+        boundaries.append(back[q][boundaries[-1]])
+    return boundaries[::-1]
+
+
+def align_claims(doc: str, claims: list[str]) -> tuple[dict, dict]:
+    """Map each claim to a contiguous span of the document it was derived from, without an LLM.
+
+    Claims are assumed to follow the order of the document. Each claim is first assigned to a sentence by token
+    overlap (stemmed, ignoring function words) under a monotonic alignment, then the sentences shared by several
+    claims are split between them. Sentences without a claim are attached to the span of the previous claim, so
+    that, like `Decompose.restore_claims`, spans are contiguous, non-overlapping and cover the document.
+
+    Overlap is measured on the distinctive words of a claim, i.e. not shared with the neighbouring claims: a claim
+    with a resolved pronoun ("Mount Everest is located in Nepal.") matches the sentence of its own facts rather
+    than the previous sentence naming the same subject.
+
+    Args:
+        doc (str): the document.
+        claims (list[str]): the claims decomposed from the document.
+
+    Returns:
+        tuple: the span of each claim as {claim: {"text", "start", "end"}}, and the confidence of each
+            claim, i.e. the fraction of its distinctive content words found in its span, 0 if a shared sentence
+            could not be split without leaving some of them in the span of another claim.
+    """
+    claims = list(dict.fromkeys(claims))
+    tokens = [(m.start(), m.end(), _stem(m.group())) for m in _TOKEN.finditer(doc)]
+    if not claims or not tokens:
+        return {}, {}
+
+    # sentences as token index ranges
+    sentence_ends = [m.start() for m in _SENTENCE_END.finditer(doc)] + [len(doc)]
+    sentences, first = [], 0
+    for end in sentence_ends:
+        last = first
+        while last < len(tokens) and tokens[last][0] < end:
+            last += 1
+        if last > first:
+            sentences.append((first, last))
+        first = last
+    sentence_stems = [{tokens[i][2] for i in range(a, b)} for a, b in sentences]
+    claim_stems = [_content_stems(claim) for claim in claims]
+    distinct_stems = [_distinct_stems(claim_stems, i) for i in range(len(claims))]
+
+    # monotonic assignment of claims to sentences maximising the total coverage of the distinctive stems,
+    # the coverage of all stems and moving on to a new sentence only break ties
+    num_sentences = len(sentences)
+    score = [
+        [_coverage(distinct, sent) + 0.1 * _coverage(stems, sent) for sent in sentence_stems]
+        for stems, distinct in zip(claim_stems, distinct_stems)
+    ]
+    best, back = [score[0][:]], [[None] * num_sentences]
+    for i in range(1, len(claims)):
+        row, row_back = [], []
+        prefix_best, prefix_arg = float("-inf"), 0
+        for s in range(num_sentences):
+            # best of the previous claim on an earlier sentence, or on the same one
+            candidates = [(prefix_best + 0.01, prefix_arg), (best[i - 1][s], s)]
+            value, arg = max(candidates, key=lambda c: c[0])
+            row.append(value + score[i][s])
+            row_back.append(arg)
+            if best[i - 1][s] > prefix_best:
+                prefix_best, prefix_arg = best[i - 1][s], s
+        best.append(row)
+        back.append(row_back)
+    assignment = [max(range(num_sentences), key=lambda s: (best[-1][s], -s))]
+    for i in range(len(claims) - 1, 0, -1):
+        assignment.append(back[i][assignment[-1]])
+    assignment = assignment[::-1]
+
+    # token range of each claim: split shared sentences, attach unassigned sentences to the previous claim
+    starts = [None] * len(claims)
+    split_failed = set()
+    i = 0
+    while i < len(claims):
+        j = i
+        while j < len(claims) and assignment[j] == assignment[i]:
+            j += 1
+        a, b = sentences[assignment[i]]
+        clause_starts = [
+            bool(_CLAUSE_PUNCTUATION.search(doc[tokens[t - 1][1] : tokens[t][0]]))
+            or doc[tokens[t][0] : tokens[t][1]].lower() in _CONJUNCTIONS
+            for t in range(a, b)
+        ]
+        boundaries = _split_chunks([tokens[t][2] for t in range(a, b)], claim_stems[i:j], clause_starts)
+        for q in range(i, j):
+            starts[q] = a + boundaries[q - i]
+        # a split is wrong if a stem of one claim only, found in the sentence, is outside the chunk of that claim
+        for q in range(i, j):
+            others = set().union(*[claim_stems[r] for r in range(i, j) if r != q])
+            chunk_stems = {tokens[t][2] for t in range(a + boundaries[q - i], a + boundaries[q - i + 1])}
+            if (claim_stems[q] - others) & sentence_stems[assignment[i]] - chunk_stems:
+                split_failed.add(q)
+        i = j
+    starts[0] = 0
+
+    claim2doc, confidence = {}, {}
+    for i, claim in enumerate(claims):
+        end_token = starts[i + 1] if i + 1 < len(claims) else len(tokens)
+        start = claim2doc[claims[i - 1]]["end"] if i > 0 else 0
+        end = tokens[end_token][0] if end_token < len(tokens) else len(doc)
+        # spans do not end with whitespace, and start right after the previous one, skipping whitespace
+        end = max(start, len(doc[:end].rstrip()))
+        while start < end and doc[start].isspace():
+            start += 1
+        claim2doc[claim] = {"text": doc[start:end], "start": start, "end": end}
+        span_stems = {tokens[t][2] for t in range(starts[i], end_token)}
+        confidence[claim] = 0.0 if i in split_failed else _coverage(distinct_stems[i], span_stems)
+    return claim2doc, confidence
@@ -3,8 +3,12 @@ import backoff
 import time
 import bs4
 import asyncio
+import weakref
+from functools import partial
 from httpx import AsyncHTTPTransport
 from httpx._client import AsyncClient
+from .async_util import run_sync
+from .cassette import intercept, RecordedResponse
 
 
 USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.14; rv:65.0) Gecko/20100101 Firefox/65.0"
@@ -33,36 +37,60 @@ def is_tag_visible(element: bs4.element) -> bool:
     return True
 
 
-transport = AsyncHTTPTransport(retries=3)
+_async_http_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> AsyncClient:
+    """Get the shared keep-alive http client bound to the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    if loop not in _async_http_clients:
+        _async_http_clients[loop] = AsyncClient(transport=AsyncHTTPTransport(retries=3))
+    return _async_http_clients[loop]
 
 
 async def httpx_get(url: str, headers: dict):
+    return await intercept("web", url, partial(_httpx_get, url, headers), dump=_dump_page, load=_load_page)
+
+
+async def _httpx_get(url: str, headers: dict):
     try:
-        async with AsyncClient(transport=transport) as client:
-            response = await client.get(url, headers=headers, timeout=3)
-            response = response if response.status_code == 200 else None
-            if not response:
-                return False, None
-            else:
-                return True, response
+        client = get_async_http_client()
+        response = await client.get(url, headers=headers, timeout=3)
+        response = response if response.status_code == 200 else None
+        if not response:
+            return False, None
+        else:
+            return True, response
     except Exception as e:  # noqa: F841
         return False, None
 
 
+def _dump_page(result):
+    flag, response = result
+    return [flag, RecordedResponse.dump(response) if response is not None else None]
+
+
+def _load_page(recorded):
+    flag, response = recorded
+    return flag, RecordedResponse(**response) if response is not None else None
+
+
 async def httpx_bind_key(url: str, headers: dict, key: str = ""):
     flag, response = await httpx_get(url, headers)
     return flag, response, url, key
 
 
 def crawl_web(query_url_dict: dict):
+    return run_sync(acrawl_web(query_url_dict))
+
+
+async def acrawl_web(query_url_dict: dict):
     tasks = list()
     for query, urls in query_url_dict.items():
         for url in urls:
             task = httpx_bind_key(url=url, headers=headers, key=query)
             tasks.append(task)
-    asyncio.set_event_loop(asyncio.SelectorEventLoop())
-    loop = asyncio.get_event_loop()
-    responses = loop.run_until_complete(asyncio.gather(*tasks))
+    responses = await asyncio.gather(*tasks)
     return responses
 
 
@@ -0,0 +1,66 @@
+import pytest
+
+from factcheck.utils.checkworthy_filter import RuleCheckworthyFilter, ChainCheckworthyFilter
+
+
+@pytest.fixture
+def rules():
+    return RuleCheckworthyFilter()
+
+
+@pytest.mark.parametrize(
+    "claim",
+    [
+        "Einstein died 1955.",
+        "Biden won 2020.",
+        "Apple IPO 1980.",
+        "Python 3.12 released.",
+        "The CEO personally approved the $5 billion acquisition of Twitter in 2022.",
+        "Thanks to the Marshall Plan, West Germany rebuilt its economy by 1955.",
+        "Welcome Trust funded 300 research projects in 2020.",
+        "Bye Bye Birdie won 4 Tony Awards in 1961.",
+    ],
+)
+def test_factual_claims_are_never_rejected(rules, claim):
+    checkworthy, confidence, reason = rules.classify([claim])[0]
+    assert checkworthy is not False, reason
+
+
+@pytest.mark.parametrize(
+    "claim, reason",
+    [
+        ("Hello everyone!", "a greeting or courtesy phrase"),
+        ("Thank you so much, John.", "a greeting or courtesy phrase"),
+        ("Is Paris the capital of France?", "a question, not a statement"),
+        ("I personally think the movie was great.", "a first person opinion"),
+        ("In my opinion the weather is nice today.", "a first person opinion"),
+    ],
+)
+def test_rejects_non_checkworthy_claims(rules, claim, reason):
+    checkworthy, confidence, actual_reason = rules.classify([claim])[0]
+    assert (checkworthy, actual_reason) == (False, reason)
+    assert confidence >= 0.9
+
+
+def test_fragments_are_left_to_the_llm_at_the_default_threshold(rules):
+    checkworthy, confidence, _ = rules.classify(["so good"])[0]
+    assert checkworthy is False
+    assert confidence < 0.9
+
+
+def test_figures_about_a_named_entity_are_checkworthy(rules):
+    assert rules.classify(["The Eiffel Tower was completed in 1889."])[0][0] is True
+    # an unresolved pronoun makes the claim unverifiable on its own
+    assert rules.classify(["It was completed in 1889."])[0][0] is None
+
+
+def test_chain_keeps_the_most_confident_decision():
+    class Constant:
+        def __init__(self, result):
+            self.result = result
+
+        def classify(self, claims):
+            return [self.result] * len(claims)
+
+    chain = ChainCheckworthyFilter([Constant((True, 0.6, "a")), Constant((False, 0.8, "b")), Constant((None, 0.0, ""))])
+    assert chain.classify(["x", "y"]) == [(False, 0.8, "b")] * 2
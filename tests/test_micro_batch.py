@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from factcheck.utils.micro_batch import MicroBatcher
+
+
+def test_concurrent_submissions_share_one_call():
+    calls = []
+
+    async def run(items):
+        calls.append(dict(items))
+        return {key: f"result of {key}" for key in items}
+
+    async def main():
+        batcher = MicroBatcher(run, window=0.01)
+        return await asyncio.gather(*[batcher.submit({f"claim {i}": i}) for i in range(3)])
+
+    results = asyncio.run(main())
+    assert results == [{f"claim {i}": f"result of claim {i}"} for i in range(3)]
+    assert calls == [{"claim 0": 0, "claim 1": 1, "claim 2": 2}]
+
+
+def test_errors_reach_every_submitter():
+    async def run(items):
+        raise ValueError("Failed to get response from LLM Client.")
+
+    async def main():
+        batcher = MicroBatcher(run, window=0.01)
+        return await asyncio.gather(batcher.submit({"a": 1}), batcher.submit({"b": 2}), return_exceptions=True)
+
+    assert [type(r) for r in asyncio.run(main())] == [ValueError, ValueError]
+
+
+def test_cancelled_submitter_does_not_cancel_the_batch():
+    async def run(items):
+        await asyncio.sleep(0.01)
+        return {key: key for key in items}
+
+    async def main():
+        batcher = MicroBatcher(run, window=0.01)
+        cancelled = asyncio.ensure_future(batcher.submit({"a": 1}))
+        kept = asyncio.ensure_future(batcher.submit({"b": 2}))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await kept
+
+    assert asyncio.run(main()) == {"b": "b"}
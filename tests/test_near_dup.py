@@ -0,0 +1,48 @@
+import pytest
+
+from factcheck.utils.near_dup import cluster_near_duplicates, simhash
+
+BASE = (
+    "The Eiffel Tower in Paris was completed in 1889 and is named after the engineer Gustave Eiffel, "
+    "whose company designed and built the tower."
+)
+
+
+def test_simhash_is_deterministic_and_ignores_case():
+    assert simhash(BASE) == simhash(BASE.upper())
+    assert simhash(BASE) != simhash("A completely different text about something else entirely.")
+
+
+@pytest.mark.parametrize(
+    "variant",
+    [BASE + " ", BASE.replace("Paris", "Paris,"), BASE.lower()],
+)
+def test_cosmetic_edits_are_merged(variant):
+    assert cluster_near_duplicates([BASE, variant]) == [0, 0]
+
+
+@pytest.mark.parametrize(
+    "variant",
+    [
+        BASE.replace("was completed", "was not completed"),
+        BASE.replace("1889", "1899"),
+        BASE.replace("is named", "was named"),
+    ],
+)
+@pytest.mark.parametrize("max_distance", [3, 12])
+def test_meaning_changing_edits_are_kept_apart(variant, max_distance):
+    assert cluster_near_duplicates([BASE, variant], max_distance=max_distance) == [0, 1]
+
+
+def test_representative_is_the_first_text_of_its_cluster():
+    other = "Berlin is the capital of Germany and its largest city by population."
+    texts = [other, BASE, other + " ", BASE.replace("Paris", "Paris,")]
+    assert cluster_near_duplicates(texts) == [0, 1, 0, 1]
+
+
+def test_symbols_keep_words_apart():
+    assert cluster_near_duplicates(["c++ release year", "c release year"], max_distance=16, shingle_size=1) == [0, 1]
+
+
+def test_empty_input():
+    assert cluster_near_duplicates([]) == []
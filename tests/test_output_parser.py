@@ -0,0 +1,77 @@
+import pytest
+
+from factcheck.utils.data_class import TokenUsage
+from factcheck.utils.output_parser import extract_json, parse_llm_output, validate_schema
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"claims": ["a", "b"]}', {"claims": ["a", "b"]}),
+        # python literals, e.g. single quotes and trailing commas, parse as they are
+        ("{'claims': ['a'], 'done': True}", {"claims": ["a"], "done": True}),
+        ('{"claims": ["a", "b",]}', {"claims": ["a", "b"]}),
+    ],
+)
+def test_extract_valid_output_is_not_repaired(text, expected):
+    assert extract_json(text) == (expected, False)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('```json\n{"claims": ["a"]}\n```', {"claims": ["a"]}),
+        ('Here is the output: {"claims": ["a"]} Hope it helps.', {"claims": ["a"]}),
+        ('{"claims": ["a", "b", "unfinished', {"claims": ["a", "b"]}),
+        ('[{"x": 1}, {"x": 2}, {"x":', [{"x": 1}, {"x": 2}]),
+    ],
+)
+def test_extract_repairs_common_defects(text, expected):
+    assert extract_json(text) == (expected, True)
+
+
+@pytest.mark.parametrize("text", ["no json here", "", None, "{unbalanced"])
+def test_extract_raises_value_error(text):
+    with pytest.raises(ValueError):
+        extract_json(text)
+
+
+def test_extract_does_not_evaluate_code():
+    with pytest.raises(ValueError):
+        extract_json("{'x': __import__('os').getcwd()}")
+
+
+@pytest.mark.parametrize(
+    "obj, schema",
+    [
+        ({"claims": ["a"]}, {"claims": [str]}),
+        ({"1": {"reasoning": "r", "relationship": "SUPPORTS"}}, {str: {"reasoning": str, "relationship": str}}),
+        ([["a", "b"]], [[str]]),
+        ({"anything": 1}, dict),
+    ],
+)
+def test_validate_schema_accepts(obj, schema):
+    assert validate_schema(obj, schema) is obj
+
+
+@pytest.mark.parametrize(
+    "obj, schema",
+    [
+        ({"claims": "a"}, {"claims": [str]}),
+        ({"other": ["a"]}, {"claims": [str]}),
+        ({"claims": ["a", 1]}, {"claims": [str]}),
+        ({1: "a"}, {str: str}),
+        (["a"], dict),
+    ],
+)
+def test_validate_schema_rejects(obj, schema):
+    with pytest.raises(ValueError):
+        validate_schema(obj, schema)
+
+
+def test_parse_counts_repaired_outputs_as_retries_avoided():
+    usage = TokenUsage()
+    assert parse_llm_output('{"claims": ["a"]}', {"claims": [str]}, usage=usage) == {"claims": ["a"]}
+    assert usage.retries_avoided == 0
+    assert parse_llm_output('```{"claims": ["a"],}```', {"claims": [str]}, usage=usage) == {"claims": ["a"]}
+    assert usage.retries_avoided == 1
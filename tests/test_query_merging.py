@@ -0,0 +1,59 @@
+import pytest
+
+from factcheck.core.Retriever.serper_retriever import SerperEvidenceRetriever, _normalize_query
+from factcheck.utils.data_class import TokenUsage
+
+
+class _Client:
+    def __init__(self):
+        self.usage = TokenUsage()
+
+
+def _retriever(**kwargs):
+    return SerperEvidenceRetriever(_Client(), {"SERPER_API_KEY": "test"}, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "query, normalized",
+    [
+        ("Where is Paris?", "where is paris"),
+        ("  WHERE is   Paris ", "where is paris"),
+        ("Paris, France?", "paris france"),
+        ("ＡＢＣ news", "abc news"),
+        ("C++ release year", "c++ release year"),
+        ("C# release year", "c# release year"),
+        ("AT&T revenue", "at&t revenue"),
+    ],
+)
+def test_normalize_query(query, normalized):
+    assert _normalize_query(query) == normalized
+
+
+def test_symbols_keep_queries_apart():
+    queries = ["C++ release year", "C# release year", "C release year", "AT&T revenue", "AT T revenue"]
+    assert len({_normalize_query(q) for q in queries}) == len(queries)
+
+
+def test_merge_identical_queries_across_claims():
+    retriever = _retriever()
+    canonical, query2claims = retriever._merge_queries(
+        {"a": ["Where is Paris?", "Paris is in France."], "b": ["where is paris", "Paris is the capital."]}
+    )
+    assert canonical["where is paris"] == "Where is Paris?"
+    assert query2claims["Where is Paris?"] == ["a", "b"]
+    assert len(query2claims) == 3
+    assert retriever.llm_client.usage.calls_saved == 1
+
+
+def test_near_duplicate_queries_need_the_same_numbers_and_words():
+    retriever = _retriever(query_max_distance=16)
+    canonical, _ = retriever._merge_queries(
+        {
+            "a": ["Who won the 2020 US presidential election?", "Who won the US presidential election in 2020?"],
+            "b": ["Who won the 2016 US presidential election?"],
+            "c": ["C++ release year", "C release year", "C# release year"],
+        }
+    )
+    assert canonical["Who won the US presidential election in 2020?"] == "Who won the 2020 US presidential election?"
+    assert canonical["Who won the 2016 US presidential election?"] == "Who won the 2016 US presidential election?"
+    assert len({canonical[q] for q in ["C++ release year", "C release year", "C# release year"]}) == 3
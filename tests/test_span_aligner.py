@@ -0,0 +1,75 @@
+from factcheck.core.Decompose import Decompose
+from factcheck.utils.span_aligner import align_claims, sentence_spans
+
+
+def _spans(doc, claims):
+    claim2doc, confidence = align_claims(doc, claims)
+    return [claim2doc[claim]["text"] for claim in claims], confidence
+
+
+def test_sentence_spans():
+    doc = "Paris is in France. Is it?\nBerlin is in Germany!"
+    assert [doc[a:b] for a, b in sentence_spans(doc)] == ["Paris is in France.", "Is it?", "Berlin is in Germany!"]
+
+
+def test_one_claim_per_sentence():
+    doc = "Paris is in France. Berlin is in Germany."
+    spans, confidence = _spans(doc, ["Paris is in France.", "Berlin is in Germany."])
+    assert spans == ["Paris is in France.", "Berlin is in Germany."]
+    assert min(confidence.values()) == 1.0
+
+
+def test_resolved_pronoun_matches_its_own_sentence():
+    doc = (
+        "Mount Everest is the highest mountain in the world. It is located in Nepal. "
+        "The Eiffel Tower is in Paris and was built in 1889."
+    )
+    claims = [
+        "Mount Everest is the highest mountain in the world.",
+        "Mount Everest is located in Nepal.",
+        "The Eiffel Tower is in Paris.",
+        "The Eiffel Tower was built in 1889.",
+    ]
+    spans, confidence = _spans(doc, claims)
+    assert spans == [
+        "Mount Everest is the highest mountain in the world.",
+        "It is located in Nepal.",
+        "The Eiffel Tower is in Paris",
+        "and was built in 1889.",
+    ]
+    assert min(confidence.values()) == 1.0
+
+
+def test_spans_are_contiguous_and_cover_the_document():
+    doc = "Paris is in France. Some filler sentence here. Berlin is in Germany."
+    claim2doc, _ = align_claims(doc, ["Paris is in France.", "Berlin is in Germany."])
+    spans = list(claim2doc.values())
+    assert spans[0]["start"] == 0 and spans[-1]["end"] == len(doc)
+    assert spans[0]["end"] <= spans[1]["start"]
+    assert "filler" in spans[0]["text"]
+
+
+def test_wrong_split_has_no_confidence():
+    # claims out of document order cannot be split without swapping their words
+    _, confidence = _spans("Alice lives in Rome and Bob lives in Oslo.", ["Bob lives in Oslo.", "Alice lives in Rome."])
+    assert min(confidence.values()) == 0.0
+
+
+def test_empty_inputs():
+    assert align_claims("", ["a claim"]) == ({}, {})
+    assert align_claims("A document.", []) == ({}, {})
+
+
+def test_restore_claims_locally_without_the_llm():
+    class NoLLM:
+        def __getattr__(self, name):
+            raise AssertionError(f"unexpected LLM client access: {name}")
+
+    decomposer = Decompose(NoLLM(), None)
+    doc = "Mount Everest is the highest mountain in the world. It is located in Nepal."
+    claims = ["Mount Everest is the highest mountain in the world.", "Mount Everest is located in Nepal."]
+    claim2doc = decomposer.restore_claims(doc, claims)
+    assert [claim2doc[c]["text"] for c in claims] == [
+        "Mount Everest is the highest mountain in the world.",
+        "It is located in Nepal.",
+    ]